@@ -0,0 +1,250 @@
+"""End-to-end load benchmark of the STL integration against the mock server.
+
+Simulated panels are polled by the real hub and coordinator for a while and
+per-cycle latency, requests per cycle, logins per hour and event loop
+blocking time are reported. The run fails when a refresh of a panel failed.
+Requires Home Assistant to be installed.
+
+    python -m benchmarks.load --panels 50 --duration 120
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from datetime import timedelta
+import json
+import logging
+import statistics
+import sys
+import tempfile
+import time
+
+from aiohttp import ClientSession
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.stl import STLAlarmHub
+from custom_components.stl.auth import async_get_account
+from custom_components.stl.client import create_session
+from custom_components.stl.const import API_URL, DOMAIN, MIN_SCAN_INTERVAL
+from custom_components.stl.coordinator import STLDataUpdateCoordinator
+from custom_components.stl.fleet import async_get_fleet
+
+from .mock_server import MockConfig, MockServer
+
+_LOGGER = logging.getLogger(__name__)
+
+BLOCKING_THRESHOLD = 0.005
+
+
+class MockSession:
+    """Client session sending requests for the cloud API to the mock server."""
+
+    def __init__(self, session: ClientSession, url: str) -> None:
+        """Initialize session."""
+        self._session = session
+        self._url = url
+
+    def _rewrite(self, url: str) -> str:
+        """Return url on the mock server."""
+        return url.replace(API_URL, self._url, 1)
+
+    async def get(self, url, **kwargs):
+        """Send GET request."""
+        return await self._session.get(self._rewrite(url), **kwargs)
+
+    async def post(self, url, **kwargs):
+        """Send POST request."""
+        return await self._session.post(self._rewrite(url), **kwargs)
+
+    def __getattr__(self, name):
+        """Pass through anything else."""
+        return getattr(self._session, name)
+
+
+class LoopMonitor:
+    """Measure how long the event loop is blocked."""
+
+    def __init__(self, interval: float = 0.01) -> None:
+        """Initialize monitor."""
+        self._interval = interval
+        self._task: asyncio.Task | None = None
+        self.blocked = 0.0
+        self.max_lag = 0.0
+
+    def start(self) -> None:
+        """Start monitoring."""
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        """Stop monitoring."""
+        self._task.cancel()
+
+    async def _run(self) -> None:
+        """Sleep repeatedly and record oversleep."""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self._interval)
+            lag = loop.time() - start - self._interval
+            self.max_lag = max(self.max_lag, lag)
+            if lag > BLOCKING_THRESHOLD:
+                self.blocked += lag
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """Run the benchmark and return results."""
+    server = MockServer(
+        MockConfig(
+            latency=args.latency,
+            jitter=args.latency / 2,
+            error_rate=args.error_rate,
+            token_ttl=args.token_ttl,
+            zones=args.zones,
+            events=args.events,
+        )
+    )
+    server.start()
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant()
+        hass.config.config_dir = config_dir
+        hass.data[DOMAIN] = {}
+        await hass.async_start()
+
+        client = create_session()
+        websession = MockSession(client, server.url)
+        latencies: list[float] = []
+        failures: list[str] = []
+        coordinators = []
+        fleet = async_get_fleet(hass)
+        for number in range(args.panels):
+            panel_id = f"{100000 + number}"
+            username = f"user{number // args.panels_per_account}@example.com"
+            account = async_get_account(hass, username, "pass", "app", websession)
+            await account.async_load()
+            fleet.register(panel_id)
+            hub = STLAlarmHub(
+                username,
+                "pass",
+                "app",
+                "1234",
+                panel_id,
+                websession,
+                account,
+                fleet=fleet,
+            )
+            coordinators.append(_create_coordinator(hass, hub, latencies, failures))
+
+        monitor = LoopMonitor()
+        monitor.start()
+        start = time.monotonic()
+        await asyncio.gather(
+            *(coordinator.async_refresh() for coordinator in coordinators)
+        )
+        startup_logins = sum(server.logins.values())
+        startup_failures = len(failures)
+        unsubs = [
+            coordinator.async_add_listener(lambda: None)
+            for coordinator in coordinators
+        ]
+        while (elapsed := time.monotonic() - start) < args.duration:
+            server.simulate_activity(args.activity)
+            await asyncio.sleep(1)
+        monitor.stop()
+
+        for unsub in unsubs:
+            unsub()
+        await client.close()
+        await hass.async_stop()
+    server.stop()
+
+    cycles = len(latencies)
+    logins = sum(server.logins.values()) - startup_logins
+    latencies.sort()
+    return {
+        "panels": args.panels,
+        "duration": round(elapsed, 1),
+        "cycles": cycles,
+        "cycle_latency": {
+            "mean": round(statistics.fmean(latencies), 4),
+            "p50": round(latencies[cycles // 2], 4),
+            "p95": round(latencies[int(cycles * 0.95)], 4),
+            "max": round(latencies[-1], 4),
+        },
+        "requests": sum(server.requests.values()),
+        "requests_per_cycle": round(sum(server.requests.values()) / cycles, 2),
+        "requests_by_endpoint": dict(server.requests),
+        "server_errors": sum(server.errors.values()),
+        "failed_refreshes": len(failures),
+        "startup_failures": startup_failures,
+        "failed_panels": len(set(failures)),
+        "startup_logins": startup_logins,
+        "logins": logins,
+        "logins_per_hour": round(logins / elapsed * 3600, 1),
+        "loop_blocked": round(monitor.blocked, 4),
+        "loop_max_lag": round(monitor.max_lag, 4),
+    }
+
+
+def _create_coordinator(
+    hass: HomeAssistant,
+    hub: STLAlarmHub,
+    latencies: list[float],
+    failures: list[str],
+) -> STLDataUpdateCoordinator:
+    """Create coordinator as done by the integration setup."""
+
+    async def async_update_data():
+        start = time.monotonic()
+        try:
+            return await hub.fetch_info()
+        except Exception:
+            failures.append(hub.alarm_id)
+            raise
+        finally:
+            latencies.append(time.monotonic() - start)
+            coordinator.update_interval = timedelta(seconds=hub.next_poll_in())
+
+    coordinator = STLDataUpdateCoordinator(
+        hass,
+        _LOGGER,
+        name="stl_api",
+        update_method=async_update_data,
+        update_interval=timedelta(seconds=MIN_SCAN_INTERVAL),
+    )
+    return coordinator
+
+
+def main() -> None:
+    """Run benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--panels", type=int, default=20)
+    parser.add_argument("--panels-per-account", type=int, default=1)
+    parser.add_argument("--zones", type=int, default=20)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=120)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--token-ttl", type=float, default=None)
+    parser.add_argument("--activity", type=float, default=0.05)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    results = asyncio.run(run(args))
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    if results["failed_refreshes"]:
+        print(
+            f"{results['failed_refreshes']} refreshes of "
+            f"{results['failed_panels']} panels failed",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""Micro-benchmarks of the CPU bound paths of the STL integration.
+
+Synthetic panels from the mock server are generated at increasing scale and
+the device parser, event scan, alarm state mapping, change detection and
+coordinator to entity fan-out are timed. Results can be saved and compared
+between commits to catch scaling regressions. Requires Home Assistant to be
+installed.
+
+    python -m benchmarks.micro --output before.json
+    python -m benchmarks.micro --compare before.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Callable
+import json
+import logging
+import platform
+import random
+import statistics
+import sys
+import time
+from types import MappingProxyType
+
+from homeassistant.components.binary_sensor import (
+    DEVICE_CLASS_DOOR,
+    BinarySensorEntityDescription,
+)
+from homeassistant.core import HomeAssistant
+
+from custom_components.stl import STLAlarmHub
+from custom_components.stl.binary_sensor import STLBinarySensor
+from custom_components.stl.const import STREAM_CHUNK_SIZE
+from custom_components.stl.coordinator import (
+    STLDataUpdateCoordinator,
+    changed_contexts,
+)
+from custom_components.stl.models import STLPanelSnapshot, STLZone
+from custom_components.stl.parser import STLDeviceParser
+
+from .mock_server import MockPanel
+
+_LOGGER = logging.getLogger(__name__)
+
+ZONE_SCALES = (10, 100, 1000)
+EVENT_SCALES = (100, 1000, 10000)
+STATES = (
+    ("DISARM", ""),
+    ("HOME", "EXIT"),
+    ("AWAY", "EXIT"),
+    ("HOME", ""),
+    ("AWAY", ""),
+    ("ENTRY_DELAY", ""),
+    ("UNKNOWN", ""),
+)
+
+
+def measure(func: Callable[[], object], repeat: int, min_time: float) -> dict:
+    """Return min and median seconds per call of func.
+
+    Calls are batched so each timed batch runs for at least min_time, which
+    keeps timer resolution out of the results for the fastest paths.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - start >= min_time:
+            break
+        number *= 2
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return {"min": min(timings), "median": statistics.median(timings)}
+
+
+def parse_devices(body: bytes) -> dict:
+    """Parse a /devices body as received, in chunks."""
+    parser = STLDeviceParser()
+    for offset in range(0, len(body), STREAM_CHUNK_SIZE):
+        parser.feed(body[offset : offset + STREAM_CHUNK_SIZE])
+    return parser.close()
+
+
+def snapshot_with_zones(devices: list) -> STLPanelSnapshot:
+    """Return snapshot with the door sensors of a /devices payload."""
+    zones = parse_devices(json.dumps(devices).encode())
+    return STLPanelSnapshot(state="DISARM", zones=MappingProxyType(zones))
+
+
+def toggle_zones(snapshot: STLPanelSnapshot, count: int) -> STLPanelSnapshot:
+    """Return snapshot with the first count zones opened or closed."""
+    zones = dict(snapshot.zones)
+    for zone in list(zones.values())[:count]:
+        zones[zone.id] = STLZone(zone.id, zone.name, not zone.is_open)
+    return snapshot._replace(zones=MappingProxyType(zones))
+
+
+def new_hub() -> STLAlarmHub:
+    """Return hub without a session, for the parts not doing requests."""
+    return STLAlarmHub("user", "pass", "app", "1234", "100000", None, None)
+
+
+def bench_parser(args: argparse.Namespace, results: dict) -> None:
+    """Time selective parsing of the /devices payload."""
+    for zones in ZONE_SCALES:
+        body = json.dumps(MockPanel("100000", zones, 0).devices()).encode()
+        results[f"parse_devices[{zones}]"] = measure(
+            lambda: parse_devices(body), args.repeat, args.min_time
+        )
+
+
+def bench_events(args: argparse.Namespace, results: dict) -> None:
+    """Time the event scan on first ingest and with one new event."""
+    for events in EVENT_SCALES:
+        panel = MockPanel("100000", 0, events)
+        history = list(panel.history)
+
+        def first_ingest() -> None:
+            new_hub()._ingest_events(history)
+
+        hub = new_hub()
+        updates, _ = hub._ingest_events(history[:-1])
+        hub._snapshot = hub._snapshot._replace(**updates)
+
+        def next_ingest() -> None:
+            hub._ingest_events(history)
+
+        results[f"ingest_events_first[{events}]"] = measure(
+            first_ingest, args.repeat, args.min_time
+        )
+        results[f"ingest_events_next[{events}]"] = measure(
+            next_ingest, args.repeat, args.min_time
+        )
+
+
+def bench_alarm_state(args: argparse.Namespace, results: dict) -> None:
+    """Time mapping panel state to alarm state."""
+    snapshots = [STLPanelSnapshot(state, status) for state, status in STATES]
+
+    def map_states() -> None:
+        for snapshot in snapshots:
+            snapshot.alarm_state  # pylint: disable=pointless-statement
+
+    results["alarm_state"] = measure(map_states, args.repeat, args.min_time)
+
+
+def bench_changes(args: argparse.Namespace, results: dict) -> None:
+    """Time finding the zones changed between two snapshots."""
+    for zones in ZONE_SCALES:
+        previous = snapshot_with_zones(MockPanel("100000", zones, 0).devices())
+        current = toggle_zones(previous, 1)
+        results[f"changed_contexts[{zones}]"] = measure(
+            lambda: changed_contexts(previous, current), args.repeat, args.min_time
+        )
+
+
+async def bench_fanout(args: argparse.Namespace, results: dict) -> None:
+    """Time notifying binary sensors of an update, one and all zones changed."""
+    hass = HomeAssistant()
+    for zones in ZONE_SCALES:
+        snapshot = snapshot_with_zones(MockPanel("100000", zones, 0).devices())
+        coordinator = STLDataUpdateCoordinator(
+            hass, _LOGGER, name="stl_benchmark", update_interval=None
+        )
+        coordinator.async_set_updated_data(snapshot)
+        hub = new_hub()
+        unsubs = []
+        for zone in snapshot.zones.values():
+            entity = STLBinarySensor(
+                hub,
+                coordinator,
+                BinarySensorEntityDescription(
+                    key=zone.id, name=zone.name, device_class=DEVICE_CLASS_DOOR
+                ),
+            )
+            entity.hass = hass
+            entity.entity_id = f"binary_sensor.door_{len(unsubs)}"
+            unsubs.append(
+                coordinator.async_add_listener(
+                    entity._handle_coordinator_update, entity.coordinator_context
+                )
+            )
+
+        for changed in (1, zones):
+            updates = [snapshot, toggle_zones(snapshot, changed)]
+            step = iter(range(sys.maxsize))
+
+            def fan_out() -> None:
+                coordinator.async_set_updated_data(updates[next(step) % 2])
+
+            results[f"fan_out[{zones},{changed} changed]"] = measure(
+                fan_out, args.repeat, args.min_time
+            )
+        for unsub in unsubs:
+            unsub()
+    await hass.async_stop(force=True)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """Run the benchmarks and return results."""
+    random.seed(args.seed)
+    results: dict[str, dict] = {}
+    bench_parser(args, results)
+    bench_events(args, results)
+    bench_alarm_state(args, results)
+    bench_changes(args, results)
+    await bench_fanout(args, results)
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> bool:
+    """Print change against a baseline, return if nothing regressed."""
+    ok = True
+    for name, timing in results["results"].items():
+        if (before := baseline["results"].get(name)) is None:
+            print(f"{name:45} {timing['min'] * 1e6:12.2f} us  (new)")
+            continue
+        ratio = timing["min"] / before["min"]
+        regressed = ratio > threshold
+        ok &= not regressed
+        print(
+            f"{name:45} {timing['min'] * 1e6:12.2f} us  {ratio:6.2f}x"
+            f"{'  REGRESSION' if regressed else ''}"
+        )
+    return ok
+
+
+def main() -> None:
+    """Run benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Compare with results in this file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="Slowdown against the baseline reported as a regression",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    results = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+        if not compare(results, baseline, args.threshold):
+            sys.exit(1)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
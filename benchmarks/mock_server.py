@@ -0,0 +1,348 @@
+"""Local stand-in for the Visonic REST API 7.0 used by the STL integration.
+
+Run standalone with ``python -m benchmarks.mock_server --port 8080`` or start
+it from another script with :class:`MockServer`.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, field
+import random
+import threading
+import time
+import uuid
+
+from aiohttp import web
+
+API_PATH = "/rest_api/7.0"
+
+
+@dataclass
+class MockConfig:
+    """Behaviour of the mock server."""
+
+    latency: float = 0.05
+    jitter: float = 0.02
+    error_rate: float = 0.0
+    token_ttl: float | None = None
+    zones: int = 10
+    events: int = 100
+    process_polls: int = 2
+
+
+@dataclass
+class MockPanel:
+    """Simulated panel."""
+
+    serial: str
+    zones: int
+    events: int
+    state: str = "DISARM"
+    status: str = ""
+    open_zones: set = field(default_factory=set)
+    history: list = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        """Create event history."""
+        for _ in range(self.events):
+            self.add_event(random.choice(("ARM", "DISMARM", "ALARM", "TROUBLE")))
+
+    def add_event(self, label: str) -> None:
+        """Add event to history."""
+        self.history.append(
+            {
+                "event": len(self.history) + 1,
+                "type_id": 1,
+                "label": label,
+                "description": label.capitalize(),
+                "appointment": "User 1",
+                "datetime": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "video": False,
+                "device_type": "USER",
+                "zone": 1,
+                "partitions": [-1],
+                "name": f"User {random.randint(1, 4)}",
+            }
+        )
+
+    def devices(self) -> list:
+        """Return /devices payload."""
+        devices = []
+        for zone in range(self.zones):
+            devices.append(
+                {
+                    "id": f"{self.serial}-{zone}",
+                    "device_number": zone,
+                    "device_type": "ZONE",
+                    "zone_type": "PERIMETER" if zone % 2 else "DELAY_1",
+                    "subtype": "MC303_VANISH" if zone % 4 != 3 else "MOTION_CAMERA",
+                    "name": f"Zone {zone}",
+                    "preenroll": False,
+                    "removable": True,
+                    "renamable": True,
+                    "enrollment_id": f"100-{zone:04d}",
+                    "partitions": [1],
+                    "warnings": (
+                        [{"type": "OPENED", "severity": "INFO", "in_memory": False}]
+                        if zone in self.open_zones
+                        else []
+                    ),
+                    "traits": {
+                        "location": {"hel": None, "name": f"Door {zone}"},
+                        "soak": {"enabled": False},
+                        "bypass": {"enabled": False},
+                    },
+                }
+            )
+        return devices
+
+
+class MockServer:
+    """Visonic REST API stand-in running on its own thread and loop."""
+
+    def __init__(self, config: MockConfig | None = None, port: int = 0) -> None:
+        """Initialize server."""
+        self.config = config or MockConfig()
+        self.port = port
+        self.panels: dict[str, MockPanel] = {}
+        self.requests: Counter = Counter()
+        self.logins: Counter = Counter()
+        self.errors: Counter = Counter()
+        self._user_tokens: dict[str, float] = {}
+        self._sessions: dict[str, tuple[str, float]] = {}
+        self._processes: dict[str, list] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._runner: web.AppRunner | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        """Return base url to use instead of the cloud API url."""
+        return f"http://127.0.0.1:{self.port}{API_PATH}"
+
+    def panel(self, serial: str) -> MockPanel:
+        """Return a panel, creating it on first use."""
+        if serial not in self.panels:
+            self.panels[serial] = MockPanel(
+                serial, self.config.zones, self.config.events
+            )
+        return self.panels[serial]
+
+    def start(self) -> None:
+        """Start serving in a background thread."""
+        started = threading.Event()
+
+        def run() -> None:
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self._async_start())
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="stl-mock", daemon=True)
+        self._thread.start()
+        started.wait()
+
+    def stop(self) -> None:
+        """Stop serving."""
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def simulate_activity(self, rate: float) -> None:
+        """Randomly change door sensors and alarm state of a share of panels."""
+        for panel in self.panels.values():
+            if random.random() < rate:
+                zone = random.randrange(panel.zones)
+                panel.open_zones ^= {zone}
+            if random.random() < rate / 10:
+                panel.state = "AWAY" if panel.state == "DISARM" else "DISARM"
+                panel.add_event("ARM" if panel.state == "AWAY" else "DISMARM")
+
+    async def _async_start(self) -> None:
+        """Start the web application."""
+        app = web.Application(middlewares=[self._middleware])
+        routes = {
+            "/auth": self._auth,
+            "/panel/login": self._panel_login,
+            "/panel_info": self._panel_info,
+            "/status": self._status,
+            "/devices": self._devices,
+            "/events": self._events,
+            "/set_state": self._set_state,
+            "/process_status": self._process_status,
+            "/alarms": self._empty,
+            "/alerts": self._empty,
+            "/troubles": self._empty,
+            "/locations": self._empty,
+            "/wakeup_sms": self._empty,
+        }
+        for path, handler in routes.items():
+            app.router.add_route("*", API_PATH + path, handler)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler) -> web.Response:
+        """Add latency and random server errors."""
+        endpoint = request.path[len(API_PATH) :]
+        self.requests[endpoint] += 1
+        await asyncio.sleep(
+            max(0.0, random.gauss(self.config.latency, self.config.jitter))
+        )
+        if random.random() < self.config.error_rate:
+            self.errors[endpoint] += 1
+            return web.json_response({"error": "Internal error"}, status=500)
+        return await handler(request)
+
+    def _session_panel(self, request: web.Request) -> MockPanel | None:
+        """Return panel of a valid session token."""
+        session = self._sessions.get(request.headers.get("Session-Token", ""))
+        if session is None:
+            return None
+        serial, expires = session
+        if time.monotonic() > expires:
+            return None
+        return self.panel(serial)
+
+    def _expires(self) -> float:
+        """Return expiry of a new token."""
+        if self.config.token_ttl is None:
+            return float("inf")
+        return time.monotonic() + self.config.token_ttl
+
+    async def _auth(self, request: web.Request) -> web.Response:
+        """Login user."""
+        data = await request.json()
+        if not data.get("email") or not data.get("password"):
+            return web.json_response({"error": "Bad credentials"}, status=401)
+        self.logins["user"] += 1
+        token = uuid.uuid4().hex
+        self._user_tokens[token] = self._expires()
+        return web.json_response({"user_token": token})
+
+    async def _panel_login(self, request: web.Request) -> web.Response:
+        """Login panel."""
+        expires = self._user_tokens.get(request.headers.get("User-Token", ""))
+        if expires is None or time.monotonic() > expires:
+            return web.json_response({"error": "Not authorized"}, status=401)
+        data = await request.json()
+        self.logins["panel"] += 1
+        token = uuid.uuid4().hex
+        self._sessions[token] = (data["panel_serial"], self._expires())
+        return web.json_response({"session_token": token})
+
+    async def _panel_info(self, request: web.Request) -> web.Response:
+        """Return panel info."""
+        if (panel := self._session_panel(request)) is None:
+            return web.json_response({"error": "Not authorized"}, status=401)
+        return web.json_response(
+            {"model": "PowerMaster 360R", "serial": panel.serial, "name": "Home"}
+        )
+
+    async def _status(self, request: web.Request) -> web.Response:
+        """Return panel status."""
+        if (panel := self._session_panel(request)) is None:
+            return web.json_response({"error": "Not authorized"}, status=401)
+        return web.json_response(
+            {
+                "connected": True,
+                "bba": {"is_active": True, "state": "online"},
+                "gprs": {"is_active": False, "state": "unknown"},
+                "partitions": [
+                    {
+                        "id": -1,
+                        "state": panel.state,
+                        "status": panel.status,
+                        "ready": not panel.open_zones,
+                        "options": [],
+                    }
+                ],
+            }
+        )
+
+    async def _devices(self, request: web.Request) -> web.Response:
+        """Return devices."""
+        if (panel := self._session_panel(request)) is None:
+            return web.json_response({"error": "Not authorized"}, status=401)
+        return web.json_response(panel.devices())
+
+    async def _events(self, request: web.Request) -> web.Response:
+        """Return event history."""
+        if (panel := self._session_panel(request)) is None:
+            return web.json_response({"error": "Not authorized"}, status=401)
+        return web.json_response(panel.history)
+
+    async def _set_state(self, request: web.Request) -> web.Response:
+        """Change alarm state, handled after a few process status polls."""
+        if (panel := self._session_panel(request)) is None:
+            return web.json_response({"error": "Not authorized"}, status=401)
+        data = await request.json()
+        token = uuid.uuid4().hex
+        self._processes[token] = [panel, data["state"], self.config.process_polls]
+        return web.json_response({"process_token": token})
+
+    async def _process_status(self, request: web.Request) -> web.Response:
+        """Return status of commands."""
+        if self._session_panel(request) is None:
+            return web.json_response({"error": "Not authorized"}, status=401)
+        result = []
+        for token in request.query.get("process_tokens", "").split(","):
+            if (process := self._processes.get(token)) is None:
+                continue
+            panel, state, polls = process
+            if polls > 0:
+                process[2] -= 1
+                result.append({"token": token, "status": "handled", "error": None})
+                continue
+            panel.state = state
+            panel.add_event("DISMARM" if state == "DISARM" else "ARM")
+            result.append({"token": token, "status": "succeeded", "error": None})
+        return web.json_response(result)
+
+    async def _empty(self, request: web.Request) -> web.Response:
+        """Return an empty list."""
+        if self._session_panel(request) is None:
+            return web.json_response({"error": "Not authorized"}, status=401)
+        return web.json_response([])
+
+
+def main() -> None:
+    """Run the mock server until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--token-ttl", type=float, default=None)
+    parser.add_argument("--zones", type=int, default=10)
+    parser.add_argument("--events", type=int, default=100)
+    args = parser.parse_args()
+
+    server = MockServer(
+        MockConfig(
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            token_ttl=args.token_ttl,
+            zones=args.zones,
+            events=args.events,
+        ),
+        port=args.port,
+    )
+    server.start()
+    print(f"Serving Visonic API on {server.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,55 +1,129 @@
 """SVENSKA TRYGGHETSLÖSNINGAR INTEGRATION FOR HOME ASSISTANT."""
+from __future__ import annotations
+
 import asyncio
+from collections import deque
+from collections.abc import Callable
+from contextlib import nullcontext
 from datetime import datetime, timedelta
+from functools import partial
+import hashlib
+import json
 import logging
+from time import monotonic
+from types import MappingProxyType
+from typing import Any
 
 import aiohttp
-from aiohttp import ClientSession
+from aiohttp import ClientResponse, ClientSession
 import async_timeout
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import (
-    STATE_ALARM_ARMED_AWAY,
-    STATE_ALARM_ARMED_HOME,
-    STATE_ALARM_ARMING,
-    STATE_ALARM_DISARMED,
-    STATE_ALARM_DISARMING,
-    STATE_ALARM_PENDING,
-    STATE_OFF,
-    STATE_ON,
-)
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.helpers import device_registry as dr
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
-
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .auth import STLAccount, async_get_account
+from .cache import STLCacheExpiry
+from .client import async_get_session
+from .commands import COMMAND_STATES, STLCommandQueue
 from .const import (
+    ALARMS_CACHE_TTL,
+    ALERTS_CACHE_TTL,
+    CHANGED_BY_LABELS,
+    COMMAND_STATE_MAX_AGE,
     CONF_APP_ID,
     CONF_CODE,
+    CONF_GRACE_PERIOD,
     CONF_PANEL,
     CONF_PASSWORD,
     CONF_USERNAME,
+    DATA_ACCOUNTS,
+    DATA_FLOW_TOKENS,
+    DEFAULT_GRACE_PERIOD,
+    DEVICES_SCAN_INTERVAL,
     DOMAIN,
+    EVENT_BUFFER_SIZE,
+    EVENTS_SCAN_INTERVAL,
     MIN_SCAN_INTERVAL,
+    PANEL_INFO_CACHE_TTL,
+    PRIORITY_BACKGROUND,
+    PRIORITY_COMMAND,
+    PRIORITY_POLL,
     PLATFORMS,
+    PROCESS_POLL_DELAY,
+    PROCESS_POLL_MAX_DELAY,
+    PROCESS_TIMEOUT,
+    REFRESH_COOLDOWN,
+    REQUEST_RETRIES,
+    STATUS_FAST_SCAN_INTERVAL,
+    STATUS_SCAN_INTERVAL,
+    STATUS_STABLE_AFTER,
+    STATUS_STABLE_SCAN_INTERVAL,
+    STORAGE_KEY_SNAPSHOT,
+    STORAGE_VERSION,
+    STREAM_CHUNK_SIZE,
+    TRACE_BUFFER_SIZE,
+    TROUBLES_CACHE_TTL,
+    URL_ALARMS,
+    URL_ALERTS,
     URL_ALL_DEVICES,
     URL_EVENTS,
-    URL_LOGIN,
     URL_PANEL_INFO,
-    URL_PANEL_LOGIN,
+    URL_PROCESS_STATUS,
     URL_SET_STATE,
     URL_STATUS,
+    URL_TROUBLES,
+)
+from .coordinator import STLDataUpdateCoordinator
+from .fleet import STLFleetScheduler, async_get_fleet
+from .history import STLEventHistory, async_get_history
+from .metrics import STLRequestMetrics, STLRequestTrace, endpoint_name
+from .models import (
+    STLEvent,
+    STLPanelIssue,
+    STLPanelSnapshot,
+    STLPartition,
+    STLResponseValidator,
 )
+from .parser import STLDeviceParser
+from .retry import backoff_delay
+from .scheduler import STLPollScheduler
+from .services import async_setup_services, async_unload_services
 
 _LOGGER = logging.getLogger(__name__)
 
+UNCHANGED = object()
+SNAPSHOT_SAVE_DELAY = 10
+# Endpoints an update waits for, others may finish after it
+AWAITED_ENDPOINTS = (URL_PANEL_INFO, URL_STATUS, URL_ALL_DEVICES)
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up from config entries."""
     hass.data.setdefault(DOMAIN, {})
 
-    websession = async_get_clientsession(hass)
+    websession = async_get_session(hass)
+
+    account = async_get_account(
+        hass,
+        entry.data[CONF_USERNAME],
+        entry.data[CONF_PASSWORD],
+        entry.data[CONF_APP_ID],
+        websession,
+    )
+    account.entries.add(entry.entry_id)
+    await account.async_load()
+    if tokens := hass.data[DOMAIN].get(DATA_FLOW_TOKENS, {}).pop(
+        entry.unique_id, None
+    ):
+        account.seed(
+            entry.data[CONF_PANEL], tokens["user_token"], tokens["session_token"]
+        )
 
     api = STLAlarmHub(
         entry.data[CONF_USERNAME],
@@ -58,23 +132,48 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         entry.data[CONF_CODE],
         entry.data[CONF_PANEL],
         websession=websession,
+        account=account,
+        store=Store(
+            hass,
+            STORAGE_VERSION,
+            STORAGE_KEY_SNAPSHOT.format(entry.data[CONF_PANEL]),
+        ),
+        history=async_get_history(hass),
+        fleet=(fleet := async_get_fleet(hass)),
     )
+    entry.async_on_unload(fleet.register(entry.data[CONF_PANEL]))
 
-    async def async_update_data() -> None:
+    async def async_update_data() -> STLPanelSnapshot:
         """Fetch data from STL."""
 
         now = datetime.utcnow()
         hass.data[DOMAIN][entry.entry_id]["last_updated"] = now
-        await api.fetch_info()
+        try:
+            return await api.fetch_info()
+        finally:
+            coordinator.update_interval = timedelta(seconds=api.next_poll_in())
 
-    coordinator = DataUpdateCoordinator(
+    coordinator = STLDataUpdateCoordinator(
         hass,
         _LOGGER,
         name="stl_api",
         update_method=async_update_data,
         update_interval=timedelta(seconds=MIN_SCAN_INTERVAL),
+        # Refreshes requested by commands in quick succession share a fetch
+        request_refresh_debouncer=Debouncer(
+            hass, _LOGGER, cooldown=REFRESH_COOLDOWN, immediate=True
+        ),
+        grace_period=timedelta(
+            seconds=entry.options.get(CONF_GRACE_PERIOD, DEFAULT_GRACE_PERIOD)
+        ),
     )
 
+    # Results of endpoints finishing after an update are applied by another
+    api.refresh_callback = lambda: hass.async_create_task(
+        coordinator.async_request_refresh()
+    )
+    entry.async_on_unload(api.async_shutdown)
+
     hass.data[DOMAIN][entry.entry_id] = {
         "api": api,
         "coordinator": coordinator,
@@ -82,9 +181,14 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     }
     _LOGGER.debug("Connected to STL API")
 
-    await coordinator.async_refresh()
-    if not coordinator.last_update_success:
-        raise ConfigEntryNotReady
+    if (snapshot := await api.async_restore()) is not None:
+        # Start from the last known state and reconcile in the background
+        coordinator.async_set_updated_data(snapshot)
+        hass.async_create_task(coordinator.async_refresh())
+    else:
+        await coordinator.async_refresh()
+        if not coordinator.last_update_success:
+            raise ConfigEntryNotReady
 
     panel_data = await api.get_panel()
     if panel_data is None:
@@ -92,6 +196,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         raise ConfigEntryNotReady
 
     hass.config_entries.async_setup_platforms(entry, PLATFORMS)
+    async_setup_services(hass)
+    entry.async_on_unload(entry.add_update_listener(async_update_listener))
 
     device_registry = dr.async_get(hass)
     device_registry.async_get_or_create(
@@ -106,6 +212,11 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     return True
 
 
+async def async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
 
@@ -114,11 +225,44 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     title = entry.title
     if unload_ok:
         hass.data[DOMAIN].pop(entry.entry_id)
+        accounts = hass.data[DOMAIN][DATA_ACCOUNTS]
+        for key, account in list(accounts.items()):
+            account.entries.discard(entry.entry_id)
+            if not account.entries:
+                accounts.pop(key)
+        if not accounts:
+            async_unload_services(hass)
         _LOGGER.debug("Unloaded entry for %s", title)
         return unload_ok
     return False
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove persisted data for a config entry."""
+    hass.data.setdefault(DOMAIN, {})
+    account = async_get_account(
+        hass,
+        entry.data[CONF_USERNAME],
+        entry.data[CONF_PASSWORD],
+        entry.data[CONF_APP_ID],
+        async_get_session(hass),
+    )
+    await account.async_remove_panel(entry.data[CONF_PANEL])
+    await Store(
+        hass, STORAGE_VERSION, STORAGE_KEY_SNAPSHOT.format(entry.data[CONF_PANEL])
+    ).async_remove()
+    await async_get_history(hass).async_remove_panel(entry.data[CONF_PANEL])
+    if not account.entries:
+        hass.data[DOMAIN][DATA_ACCOUNTS].pop(
+            (entry.data[CONF_USERNAME], entry.data[CONF_APP_ID])
+        )
+
+
+def _event_key(event: dict) -> tuple:
+    """Return key identifying an event."""
+    return (event.get("event"), event.get("datetime"))
+
+
 class STLAlarmHub(object):
     """Svensk Trygghetslosningar connectivity hub."""
 
@@ -130,288 +274,651 @@ class STLAlarmHub(object):
         code: str,
         panel_id: str,
         websession: ClientSession,
+        account: STLAccount,
+        store: Store | None = None,
+        history: STLEventHistory | None = None,
+        fleet: STLFleetScheduler | None = None,
     ) -> None:
         """Initialize STL hub."""
 
-        self._state = ""
-        self._status: str = ""
-        self._is_online: str = ""
-        self._is_ready: str = ""
-        self._changed_by: str = ""
+        self._snapshot = STLPanelSnapshot()
         self._websession = websession
         self._username = username
         self._password = password
         self._app_id = app_id
         self._code = code
         self._panel: dict = {}
-        self._devices: list = []
         self._panel_id = panel_id
-        self._access_token: str = ""
-        self._session_token: str = ""
+        self._account = account
+        self._store = store
+        self._history = history
+        self._fleet = fleet
+        self.metrics = STLRequestMetrics()
+        self.traces: deque[STLRequestTrace] = deque(maxlen=TRACE_BUFFER_SIZE)
+        self._validators: dict[str, STLResponseValidator] = {}
+        self._cache = STLCacheExpiry(
+            {
+                URL_PANEL_INFO: PANEL_INFO_CACHE_TTL,
+                URL_ALARMS: ALARMS_CACHE_TTL,
+                URL_ALERTS: ALERTS_CACHE_TTL,
+                URL_TROUBLES: TROUBLES_CACHE_TTL,
+            }
+        )
+        self._scheduler = STLPollScheduler(
+            {
+                URL_ALL_DEVICES: DEVICES_SCAN_INTERVAL,
+                URL_STATUS: STATUS_SCAN_INTERVAL,
+                URL_EVENTS: EVENTS_SCAN_INTERVAL,
+            },
+            partial(fleet.align, panel_id) if fleet is not None else None,
+        )
+        self._commands = STLCommandQueue(self._send_command, self._known_alarm_state)
+        self._status_fetched_at = float("-inf")
+        self._commanded_states: dict[int, tuple[str, float]] = {}
+        self._fetching: asyncio.Task[STLPanelSnapshot] | None = None
+        self._background: dict[str, asyncio.Task] = {}
+        self._cache_spread = False
+        self.refresh_callback: Callable[[], Any] | None = None
+        self._last_status: tuple | None = None
+        self._status_changed_at: float = monotonic()
         self._last_updated: datetime = datetime.utcnow() - timedelta(hours=2)
         self._last_updated_temp: datetime = datetime.utcnow() - timedelta(hours=2)
         self._timeout: int = 15
 
+    async def async_restore(self) -> STLPanelSnapshot | None:
+        """Restore the last known panel information and snapshot."""
+        if self._store is None or not (data := await self._store.async_load()):
+            return None
+        try:
+            snapshot = STLPanelSnapshot.from_dict(data["snapshot"])
+            panel = data["panel"]
+            if not panel:
+                raise KeyError("panel")
+        except (KeyError, TypeError):
+            _LOGGER.warning("Ignoring invalid stored state of panel %s", self._panel_id)
+            return None
+        self._panel = panel
+        self._snapshot = snapshot
+        return snapshot
+
+    def _stored_data(self) -> dict:
+        """Return data to persist."""
+        return {"panel": self._panel, "snapshot": self._snapshot.as_dict()}
+
     async def get_panel(self) -> str:
         """Return panel information."""
         panel = self._panel
 
-        if panel is None or panel == []:
+        if not panel:
             _LOGGER.debug("Failed to fetch panel")
             return None
 
         return str(panel["model"]) + str(panel["serial"])
 
-    async def get_door_sensors(self) -> list:
-        """Return id on door sensors."""
-        if self._devices:
-            return (_id["id"] for _id in self._devices)
-
-    async def get_door_sensor_names(self, identity) -> str:
-        """Return name on door sensor."""
-        for _id in self._devices:
-            if _id["id"] == identity:
-                return _id["name"]
-
-    async def triggeralarm(self, command, code) -> None:
-        """Change state of alarm."""
-
-        headers = {
-            "Content-Type": "application/json",
-            "Connection": "keep-alive",
-            "Accept": "*/*",
-            "User-Agent": "Visonic GO/2.8.62.91 CFNetwork/901.1 Darwin/17.6.0",
-            "Accept-Language": "en-us",
-            "Accept-Encoding": "br, gzip, deflate",
-        }
-        headers["User-Token"] = self._access_token
-        headers["Session-Token"] = self._session_token
+    async def triggeralarm(self, command, code, partition: int = -1) -> bool:
+        """Change state of alarm of a partition, -1 for all partitions.
+
+        Commands are queued and sent one at a time. Return True when the
+        panel reports the command succeeded or was already in its state.
+        """
+        if command not in COMMAND_STATES:
+            command = "disarm"
+        return await self._commands.submit(command, partition)
 
+    def _known_alarm_state(self, partition_id: int, since: float) -> str | None:
+        """Return state of alarm known since a loop time, None if not known.
+
+        Commands handled since count, status counts when fetched since or
+        shortly before.
+        """
+        since -= COMMAND_STATE_MAX_AGE
+        if (commanded := self._commanded_states.get(partition_id)) is not None:
+            return commanded[0] if commanded[1] >= since else None
+        if self._status_fetched_at < since:
+            return None
+        if (partition := self._snapshot.partition(partition_id)) is not None:
+            return partition.alarm_state
+        return self._snapshot.alarm_state
+
+    async def _send_command(self, command: str, partition: int) -> bool:
+        """Send a command to the panel and wait for it to be handled."""
         message_json = {
-            "partition": -1,
+            "partition": partition,
         }
 
         if command == "full":
             message_json["state"] = "AWAY"
-            get_process_token = await self._request(
-                URL_SET_STATE, json_data=message_json
-            )
         elif command == "partial":
             message_json["state"] = "HOME"
-            get_process_token = await self._request(
-                URL_SET_STATE, json_data=message_json
-            )
         else:
             message_json["state"] = "DISARM"
-            get_process_token = await self._request(
-                URL_SET_STATE, json_data=message_json
-            )
-
-        _LOGGER.debug("Process info: %s", get_process_token)
 
-        """ TO BE USED LATER
-        process_token_json = await get_process_token.json()
-        process_token = process_token_json["process_token"]
-        check_token = await self._request(
-            url_process_status + "?process_tokens=" + str(process_token),
-            json_data=message_json,
+        response = await self._request(
+            URL_SET_STATE, json_data=message_json, priority=PRIORITY_COMMAND
         )
-        """
-        await self.fetch_info()
-
-    async def fetch_info(self) -> None:
-        """Fetch info from API."""
-        if not self._panel:
-            response = await self._request(URL_PANEL_INFO)
-            if not response:
-                raise UpdateFailed
-            self._panel = await response.json()
-
-        response = await self._request(URL_ALL_DEVICES)
-        if not response:
-            raise UpdateFailed
-        _devicelist = await response.json()
-        self._devices = []
-        for device in _devicelist:
-            if (
-                device["zone_type"] == "PERIMETER" or device["zone_type"] == "DELAY_1"
-            ) and device["subtype"] == "MC303_VANISH":
-                _name = device["traits"]["location"]["name"]
-                _id = device["id"]
-                _status = STATE_OFF
-                if device["warnings"]:
-                    for warning in device["warnings"]:
-                        if warning["type"] == "OPENED":
-                            _status = STATE_ON
-                self._devices.append({"id": _id, "name": _name, "status": _status})
-
-        response = await self._request(URL_STATUS)
-        if response:
-            json_data = await response.json()
-            try:
-                self._state = json_data["partitions"][0]["state"]
-                self._status = ""
-                if "status" in json_data["partitions"][0]:
-                    self._status = json_data["partitions"][0]["status"]
-                self._is_online = json_data["connected"]
-                self._is_ready = json_data["partitions"][0]["ready"]
-            except aiohttp.ClientConnectorError as error:
-                _LOGGER.error(
-                    "ClientError connecting to API: %s ", error, exc_info=True
-                )
-                self._status = None
-            except aiohttp.ContentTypeError as error:
-                _LOGGER.error("ContentTypeError connecting to API: %s ", error)
-                self._status = None
-            except asyncio.TimeoutError:
-                _LOGGER.error("Timed out when connecting to API")
-                self._status = None
-            except asyncio.CancelledError:
-                _LOGGER.error("Task was cancelled")
-                self._status = None
-
-        response = await self._request(URL_EVENTS)
-        if response:
-            json_data = await response.json()
-            for users in json_data[::-1]:
-                if users["label"] == "ARM" or users["label"] == "DISMARM":
-                    self._changed_by = users["name"]
-                    break
-                self._changed_by = "unknown"
-
-    async def _request(self, url, json_data=None, retry=3) -> dict:
-        if self._access_token is None or self._session_token is None:
-            result = await self._login()
-            if not result:
-                raise UpdateFailed
-
-        message_headers = {
-            "Content-Type": "application/json",
-            "Connection": "keep-alive",
-            "Accept": "*/*",
-            "User-Agent": "Visonic GO/2.8.62.91 CFNetwork/901.1 Darwin/17.6.0",
-            "Accept-Language": "en-us",
-            "Accept-Encoding": "br, gzip, deflate",
-        }
-        message_headers["User-Token"] = self._access_token
-        message_headers["Session-Token"] = self._session_token
-
-        try:
-            with async_timeout.timeout(self._timeout):
-                if json_data:
-                    response = await self._websession.post(
-                        url, json=json_data, headers=message_headers
+        process_info = await response.json()
+        _LOGGER.debug("Process info: %s", process_info)
+
+        handled = await self._wait_for_process(process_info["process_token"])
+        # Status polled while the command ran can not include it
+        self._scheduler.request(URL_STATUS)
+        if not handled:
+            return False
+        commanded = (COMMAND_STATES[command], asyncio.get_running_loop().time())
+        if partition == -1:
+            for known in self._snapshot.partitions:
+                self._commanded_states[known.id] = commanded
+        self._commanded_states[partition] = commanded
+        return True
+
+    async def _wait_for_process(self, process_token: str) -> bool:
+        """Poll process status until the panel has handled a command."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + PROCESS_TIMEOUT
+        delay = PROCESS_POLL_DELAY
+        while True:
+            response = await self._request(
+                f"{URL_PROCESS_STATUS}?process_tokens={process_token}",
+                priority=PRIORITY_COMMAND,
+            )
+            for process in await response.json():
+                if process.get("token") != process_token:
+                    continue
+                if process.get("status") == "succeeded":
+                    return True
+                if process.get("status") == "failed":
+                    _LOGGER.warning(
+                        "Command failed: %s", process.get("error") or process
                     )
-                else:
-                    response = await self._websession.get(url, headers=message_headers)
+                    return False
 
-            if response.status in (200, 204):
-                return response
-            self._access_token = None
-            self._session_token = None
-            await asyncio.sleep(2)
-            if retry > 0:
-                return await self._request(url, json_data, retry=retry - 1)
-            _LOGGER.error("Could not retrieve data after 3 attempts")
+            if loop.time() + delay > deadline:
+                _LOGGER.warning("Timed out waiting for command to finish")
+                return False
+            await asyncio.sleep(delay)
+            delay = min(delay * 1.5, PROCESS_POLL_MAX_DELAY)
 
-        except aiohttp.ClientConnectorError as error:
-            _LOGGER.error("ClientError connecting to API: %s ", error, exc_info=True)
+    def command_pending(self, partition_id: int) -> bool:
+        """Return if a handled command is not yet seen in fetched status."""
+        return partition_id in self._commanded_states
 
-        except aiohttp.ContentTypeError as error:
-            _LOGGER.error("ContentTypeError connecting to API: %s ", error)
+    async def fetch_info(self) -> STLPanelSnapshot:
+        """Fetch info from API and return a snapshot of the panel.
 
-        except asyncio.TimeoutError:
-            _LOGGER.error("Timed out when connecting to API")
+        Only one fetch runs at a time, concurrent callers join the fetch in
+        flight. When endpoints were requested after it started, such as
+        status after a command, or a fetch it left running finished, a new
+        fetch follows once it finishes.
+        """
+        while (fetching := self._fetching) is not None:
+            snapshot = await asyncio.shield(fetching)
+            if not self._scheduler.due() and not any(
+                task.done() for task in self._background.values()
+            ):
+                return snapshot
+        self._fetching = fetching = asyncio.create_task(self._fetch_info())
+        fetching.add_done_callback(self._fetch_done)
+        return await asyncio.shield(fetching)
+
+    def _fetch_done(self, fetching: asyncio.Task) -> None:
+        """Forget a finished fetch."""
+        if self._fetching is fetching:
+            self._fetching = None
+        # Callers that gave up do not retrieve the error, it is not unhandled
+        if not fetching.cancelled():
+            fetching.exception()
+
+    def async_shutdown(self) -> None:
+        """Cancel fetches left running by updates."""
+        self.refresh_callback = None
+        for task in self._background.values():
+            task.cancel()
+
+    def _background_done(
+        self, url: str, deadline: asyncio.TimerHandle, task: asyncio.Task
+    ) -> None:
+        """Request an update applying a fetch that finished after its cycle."""
+        deadline.cancel()
+        # Errors are reported by the update applying the fetch, if any
+        if not task.cancelled():
+            task.exception()
+        if self.refresh_callback is not None and self._background.get(url) is task:
+            self.refresh_callback()
+
+    async def _fetch_info(self) -> STLPanelSnapshot:
+        """Fetch endpoints due and return a snapshot of the panel.
+
+        The endpoints are independent of each other so they are requested
+        concurrently, bounded by a single deadline for the whole cycle.
+        Updates only wait for the panel, its status and devices. Slower
+        endpoints left running finish in the background within the same
+        deadline, and their results are applied by the next update.
+        Only a failure to read the status, or the panel before it is known,
+        fails the update. Other endpoints keep their previous values if
+        they fail. Slow moving endpoints are only fetched once their cached
+        response has expired, their first fetch is delayed by the phase of
+        the panel so the panels of a fleet take turns.
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        if self._fleet is not None and not self._cache_spread:
+            # First fetches of the panels take turns, except for panel
+            # information while the panel is unknown
+            self._cache_spread = True
+            self._cache.spread(
+                self._fleet.phase(self._panel_id),
+                URL_ALARMS,
+                URL_ALERTS,
+                URL_TROUBLES,
+                *((URL_PANEL_INFO,) if self._panel else ()),
+            )
+        scheduled = self._scheduler.due()
+        fetchers = {
+            URL_PANEL_INFO: self._fetch_panel,
+            URL_ALL_DEVICES: self._fetch_devices,
+            URL_STATUS: self._fetch_status,
+            URL_EVENTS: self._fetch_events,
+            URL_ALARMS: partial(self._fetch_issues, URL_ALARMS, "alarms", "alarm_type"),
+            URL_ALERTS: partial(self._fetch_issues, URL_ALERTS, "alerts", "alert_type"),
+            URL_TROUBLES: partial(
+                self._fetch_issues, URL_TROUBLES, "troubles", "trouble_type"
+            ),
+        }
+        tasks = {}
+        for url in scheduled | self._cache.expired():
+            if url in scheduled:
+                self._scheduler.mark_polled(url)
+            if url not in self._background:
+                tasks[url] = loop.create_task(fetchers[url]())
+        # Fetches finished since the previous update are applied with this one
+        for url, task in list(self._background.items()):
+            if task.done():
+                tasks[url] = self._background.pop(url)
+        if not tasks:
+            return self._snapshot
+
+        awaited = [tasks[url] for url in AWAITED_ENDPOINTS if url in tasks]
+        pending: set[asyncio.Task] = set()
+        if awaited:
+            _, pending = await asyncio.wait(awaited, timeout=MIN_SCAN_INTERVAL)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        for url, task in list(tasks.items()):
+            if not task.done():
+                self._background[url] = tasks.pop(url)
+                deadline = loop.call_at(start + MIN_SCAN_INTERVAL, task.cancel)
+                task.add_done_callback(partial(self._background_done, url, deadline))
+        self.metrics.record_cycle(loop.time() - start, bool(pending))
+
+        failed = []
+        updates = {}
+        for url, task in tasks.items():
+            if task.cancelled() or task.exception() is not None:
+                failed.append(url)
+                self._validators.pop(url, None)
+                if url in self._cache:
+                    self._cache.defer(url, MIN_SCAN_INTERVAL)
+                _LOGGER.debug(
+                    "Fetching %s failed: %s",
+                    url,
+                    "deadline exceeded" if task.cancelled() else task.exception(),
+                )
+            else:
+                updates.update(task.result())
+
+        # Parts fetched are kept even when the update fails, their validators
+        # are saved and the same body would not be applied on a later cycle
+        if updates:
+            self._snapshot = self._snapshot._replace(**updates)
+        # Stored state is only restored with the panel information
+        if self._store is not None and self._panel and (
+            updates or URL_PANEL_INFO in tasks
+        ):
+            self._store.async_delay_save(self._stored_data, SNAPSHOT_SAVE_DELAY)
+
+        # A failed refresh of panel information is deferred like other cached
+        # endpoints, it only fails the update while the panel is unknown
+        if URL_STATUS in failed or (URL_PANEL_INFO in failed and not self._panel):
+            raise UpdateFailed(f"Could not retrieve {', '.join(failed)}")
+        if failed:
+            _LOGGER.warning(
+                "Could not retrieve %s, keeping previous data", ", ".join(failed)
+            )
 
-        except asyncio.CancelledError:
-            _LOGGER.error("Task was cancelled")
+        if URL_STATUS in tasks:
+            self._status_fetched_at = start
+        if self._commanded_states and URL_STATUS in tasks:
+            # Status requested after a command finished includes it
+            self._commanded_states = {
+                partition: commanded
+                for partition, commanded in self._commanded_states.items()
+                if commanded[1] >= start
+            }
+        self._adapt_status_interval()
+        return self._snapshot
+
+    def next_poll_in(self) -> float:
+        """Return seconds until the next endpoint is due for polling."""
+        return max(
+            min(self._scheduler.next_poll_in(), self._cache.next_expiry_in()),
+            STATUS_FAST_SCAN_INTERVAL,
+        )
 
-        raise UpdateFailed
+    def _adapt_status_interval(self) -> None:
+        """Poll status quickly during exit/entry delay, slowly when stable."""
+        partitions = self._snapshot.partitions
+        status = tuple((partition.state, partition.status) for partition in partitions)
+        if status != self._last_status:
+            if self._last_status is not None:
+                self._scheduler.request(URL_EVENTS)
+                self._cache.invalidate(URL_ALARMS, URL_ALERTS, URL_TROUBLES)
+            self._last_status = status
+            self._status_changed_at = monotonic()
+
+        if any(
+            partition.status == "EXIT" or partition.state == "ENTRY_DELAY"
+            for partition in partitions
+        ):
+            interval = STATUS_FAST_SCAN_INTERVAL
+        elif monotonic() - self._status_changed_at > STATUS_STABLE_AFTER:
+            interval = STATUS_STABLE_SCAN_INTERVAL
+        else:
+            interval = STATUS_SCAN_INTERVAL
+        self._scheduler.set_interval(URL_STATUS, interval)
 
-    async def _login(self) -> bool:
-        """Login to retrieve access token."""
+    async def _fetch_json(self, url: str, parser=None) -> Any:
+        """Fetch and decode url, return UNCHANGED if the body is unchanged.
 
-        message_headers = {
-            "Content-Type": "application/json",
-            "Connection": "keep-alive",
-            "Accept": "*/*",
-            "User-Agent": "Visonic GO/2.8.62.91 CFNetwork/901.1 Darwin/17.6.0",
-            "Accept-Language": "en-us",
-            "Accept-Encoding": "br, gzip, deflate",
-        }
+        Sends ETag/Last-Modified validators when the server provided them,
+        otherwise compares a digest of the raw body with the previous one.
+        With a parser the body is streamed into it instead of decoded whole.
+        """
+        headers = {}
+        if validator := self._validators.get(url):
+            if validator.etag:
+                headers["If-None-Match"] = validator.etag
+            if validator.last_modified:
+                headers["If-Modified-Since"] = validator.last_modified
+
+        response = await self._request(
+            url,
+            headers=headers,
+            stream=parser is not None,
+            priority=(
+                PRIORITY_POLL if url in AWAITED_ENDPOINTS else PRIORITY_BACKGROUND
+            ),
+        )
+        if response.status == 304:
+            return UNCHANGED
+        if parser is None:
+            body = await response.read()
+            digest = hashlib.blake2b(body, digest_size=16).digest()
+            if validator and validator.digest == digest:
+                return UNCHANGED
+            data = json.loads(body)
+        else:
+            hasher = hashlib.blake2b(digest_size=16)
+            async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                hasher.update(chunk)
+                parser.feed(chunk)
+            digest = hasher.digest()
+            if validator and validator.digest == digest:
+                return UNCHANGED
+            data = parser.close()
+        self._validators[url] = STLResponseValidator(
+            response.headers.get("ETag"), response.headers.get("Last-Modified"), digest
+        )
+        return data
+
+    async def _fetch_cached(self, url: str) -> Any:
+        """Fetch cached url and renew its expiry, return UNCHANGED if unchanged."""
+        data = await self._fetch_json(url)
+        self._cache.renew(url)
+        return data
+
+    async def _fetch_panel(self) -> dict:
+        """Fetch panel information."""
+        if (panel := await self._fetch_cached(URL_PANEL_INFO)) is not UNCHANGED:
+            self._panel = panel
+        return {}
+
+    async def _fetch_issues(self, url: str, key: str, type_key: str) -> dict:
+        """Fetch alarms, alerts or troubles of the panel."""
+        if (items := await self._fetch_cached(url)) is UNCHANGED:
+            return {}
+        issues = tuple(STLPanelIssue.from_api(item, type_key) for item in items)
+        if issues == getattr(self._snapshot, key):
+            return {}
+        return {key: issues}
+
+    async def _fetch_devices(self) -> dict:
+        """Fetch door sensors."""
+        zones = await self._fetch_json(URL_ALL_DEVICES, STLDeviceParser())
+        if zones is UNCHANGED or zones == self._snapshot.zones:
+            return {}
+        return {"zones": MappingProxyType(zones)}
+
+    async def _fetch_status(self) -> dict:
+        """Fetch alarm status."""
+        if (json_data := await self._fetch_json(URL_STATUS)) is UNCHANGED:
+            return {}
         try:
-            with async_timeout.timeout(self._timeout):
-                response = await self._websession.post(
-                    URL_LOGIN,
-                    headers=message_headers,
-                    json={
-                        "email": self._username,
-                        "password": self._password,
-                        "app_id": self._app_id,
-                    },
+            partitions = tuple(
+                STLPartition(
+                    partition["id"],
+                    partition["state"],
+                    partition.get("status", ""),
+                    partition["ready"],
+                )
+                for partition in json_data["partitions"]
+            )
+            first = partitions[0]
+            return {
+                "state": first.state,
+                "status": first.status,
+                "is_online": json_data["connected"],
+                "is_ready": first.is_ready,
+                "partitions": partitions,
+            }
+        except (KeyError, IndexError, TypeError) as error:
+            raise UpdateFailed(f"Unexpected status response: {error}") from error
+
+    async def _fetch_events(self) -> dict:
+        """Fetch events to find who last changed the alarm.
+
+        New events are added to the local history, which also answers who
+        last changed the alarm when the fetched events do not tell.
+        """
+        if (events := await self._fetch_json(URL_EVENTS)) is UNCHANGED:
+            return {}
+        first_ingest = self._event_cursor is None
+        updates, new_events = self._ingest_events(events)
+        if self._history is not None and new_events:
+            await self._history.async_add(self._panel_id, new_events)
+        if first_ingest and new_events and "changed_by" not in updates:
+            changed_by = None
+            if self._history is not None:
+                changed_by = await self._history.async_last_user(
+                    self._panel_id, CHANGED_BY_LABELS
                 )
+            updates["changed_by"] = changed_by or "unknown"
+        return updates
 
-                if response.status in (200, 204):
-                    token_user = await response.json()
-                    self._access_token = token_user["user_token"]
-                    message_headers["User-Token"] = self._access_token
-
-                    response = await self._websession.post(
-                        URL_PANEL_LOGIN,
-                        headers=message_headers,
-                        json={
-                            "user_code": self._code,
-                            "app_type": "com.visonic.PowerMaxApp",
-                            "app_id": self._app_id,
-                            "panel_serial": self._panel_id,
-                        },
-                    )
+    @property
+    def _event_cursor(self) -> tuple | None:
+        """Return key of the newest event in the snapshot."""
+        if not (events := self._snapshot.events):
+            return None
+        return (events[-1].id, events[-1].datetime)
 
-                    if response.status in (200, 204):
-                        token_session = await response.json()
-                        self._session_token = token_session["session_token"]
-                        return True
+    def _ingest_events(self, events: list) -> tuple[dict, list[STLEvent]]:
+        """Return events newer than the cursor added to the event buffer.
 
-                self._access_token = None
-                self._session_token = None
-                raise UpdateFailed
+        Events are listed oldest first, so only the tail after the newest
+        event already seen is walked. Return updates and the new events,
+        all of them when kept in history, oldest first. The buffer, and so
+        the cursor, only moves once the updates are applied to the snapshot.
+        """
+        if not events:
+            return {}, []
+        limit = EVENT_BUFFER_SIZE if self._history is None else len(events)
+        new_events = []
+        changed_by = None
+        for event in reversed(events):
+            if _event_key(event) == self._event_cursor:
+                break
+            if changed_by is None and event["label"] in CHANGED_BY_LABELS:
+                changed_by = event["name"]
+            if len(new_events) < limit:
+                new_events.append(STLEvent.from_api(event))
+            elif changed_by is not None:
+                break
+
+        if not new_events:
+            return {}, []
+        new_events.reverse()
+        updates = {
+            "events": (*self._snapshot.events, *new_events)[-EVENT_BUFFER_SIZE:]
+        }
+        if changed_by is not None:
+            updates["changed_by"] = changed_by
+        return updates, new_events
 
-        except aiohttp.ClientConnectorError as error:
-            _LOGGER.error("ClientError connecting to API: %s ", error, exc_info=True)
+    async def _request(
+        self,
+        url,
+        json_data=None,
+        headers=None,
+        stream=False,
+        priority=PRIORITY_POLL,
+    ) -> ClientResponse:
+        """Send request, retrying depending on how it failed.
+
+        Rejected tokens are renewed and the request retried straight away,
+        rate limiting and server errors are retried with backoff. Commands
+        are only retried when they cannot have reached the panel. GET
+        responses are read and shared with identical requests in flight,
+        unless streamed in which case the body is left for the caller.
+        Requests wait for the fleet scheduler, in the order of their priority.
+        Every attempt is traced, without headers or query of the request.
+        """
+        metrics = self.metrics.endpoint(url)
+        breaker = self._account.breaker
+        endpoint = endpoint_name(url)
+        delay = 0.0
+
+        for attempt in range(REQUEST_RETRIES + 1):
+            if attempt:
+                metrics.retries += 1
+                await asyncio.sleep(delay)
+
+            logins = self.logins
+            user_token, session_token = await self._account.async_get_tokens(
+                self._panel_id, self._code
+            )
+            breaker.before_request()
+            trace = STLRequestTrace(
+                endpoint, "POST" if json_data else "GET", attempt, self.logins != logins
+            )
+            self.traces.append(trace)
 
-        except aiohttp.ContentTypeError as error:
-            _LOGGER.error("ContentTypeError connecting to API: %s ", error)
+            # Constant headers are defaults of the session
+            message_headers = {"User-Token": user_token, "Session-Token": session_token}
+            if headers:
+                message_headers.update(headers)
 
-        except asyncio.TimeoutError:
-            _LOGGER.error("Timed out when connecting to API")
+            slot = (
+                self._fleet.request_slot(priority)
+                if self._fleet is not None
+                else nullcontext()
+            )
+            metrics.requests += 1
+            queued = monotonic()
+            try:
+                async with slot:
+                    start = monotonic()
+                    trace.start = dt_util.utcnow().isoformat()
+                    trace.wait = start - queued
+                    with async_timeout.timeout(self._timeout):
+                        if json_data:
+                            response = await self._websession.post(
+                                url, json=json_data, headers=message_headers
+                            )
+                        elif stream:
+                            response = await self._websession.get(
+                                url, headers=message_headers
+                            )
+                        else:
+                            response = await self._account.async_coalesce(
+                                (url, session_token),
+                                lambda: self._get(url, message_headers),
+                            )
 
-        except asyncio.CancelledError:
-            _LOGGER.error("Task was cancelled")
+            except asyncio.TimeoutError:
+                trace.duration = monotonic() - start
+                trace.error = "timeout"
+                metrics.timeouts += 1
+                breaker.record_failure()
+                _LOGGER.debug("Timed out requesting %s", endpoint)
+                if json_data:
+                    break
+                delay = backoff_delay(attempt)
+                continue
+
+            except aiohttp.ClientError as error:
+                trace.duration = monotonic() - start
+                # Messages of client errors can include the url with its query
+                trace.error = type(error).__name__
+                metrics.network_errors += 1
+                breaker.record_failure()
+                _LOGGER.debug("Error requesting %s: %s", endpoint, error)
+                if json_data and not isinstance(error, aiohttp.ClientConnectorError):
+                    break
+                delay = backoff_delay(attempt)
+                continue
+
+            trace.duration = monotonic() - start
+            trace.status = response.status
+            trace.size = (
+                response.content_length
+                if json_data or stream
+                else len(await response.read())
+            )
+            metrics.record(trace.duration, response.status)
+            if response.status in (200, 204, 304):
+                breaker.record_success()
+                return response
 
-        return None
+            _LOGGER.debug("Requesting %s returned %s", endpoint, response.status)
+            # Streamed and posted bodies are unread and hold their connection
+            response.release()
+            if response.status in (401, 403):
+                breaker.record_success()
+                self._account.invalidate(self._panel_id, session_token)
+                delay = 0
+            elif response.status == 429 or response.status >= 500:
+                breaker.record_failure()
+                if json_data and response.status != 429:
+                    break
+                delay = backoff_delay(attempt, response.headers.get("Retry-After"))
+            else:
+                breaker.record_success()
+                break
 
-    @property
-    def alarm_state(self) -> str:
-        """Return state of alarm."""
-
-        if self._state == "DISARM":
-            return STATE_ALARM_DISARMED
-        if self._state == "HOME" and self._status == "EXIT":
-            return STATE_ALARM_ARMING
-        if self._state == "AWAY" and self._status == "EXIT":
-            return STATE_ALARM_ARMING
-        if self._state == "HOME":
-            return STATE_ALARM_ARMED_HOME
-        if self._state == "AWAY":
-            return STATE_ALARM_ARMED_AWAY
-        if self._state == "ENTRY_DELAY":
-            return STATE_ALARM_DISARMING
-        return STATE_ALARM_PENDING
+        raise UpdateFailed(f"Could not retrieve {endpoint}")
+
+    async def _get(self, url: str, headers: dict) -> ClientResponse:
+        """Get url with the body read, so the response can be shared."""
+        response = await self._websession.get(url, headers=headers)
+        await response.read()
+        return response
 
     @property
-    def alarm_changed_by(self) -> str:
-        """Return alarm changed by."""
-        return self._changed_by
+    def logins(self) -> int:
+        """Return number of logins made for this panel."""
+        return self._account.panel_logins(self._panel_id)
 
     @property
     def alarm_id(self) -> str:
@@ -422,18 +929,3 @@ class STLAlarmHub(object):
     def alarm_displayname(self) -> str:
         """Return friendly displayname."""
         return "Visonic " + str(self._panel_id)
-
-    @property
-    def alarm_isonline(self) -> str:
-        """Return is alarm online."""
-        return self._is_online
-
-    @property
-    def alarm_ready(self) -> str:
-        """Return is alarm ready."""
-        return self._is_ready
-
-    @property
-    def get_doorsensor_states(self) -> dict:
-        """Return state of doorsensors."""
-        return {_device["id"]: _device["status"] for _device in self._devices}
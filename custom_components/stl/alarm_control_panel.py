@@ -10,17 +10,16 @@ from homeassistant.components.alarm_control_panel.const import (
     SUPPORT_ALARM_ARM_HOME,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import STATE_ALARM_PENDING
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.const import STATE_ALARM_ARMING, STATE_ALARM_DISARMING
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import (
-    CoordinatorEntity,
-    DataUpdateCoordinator,
-)
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .__init__ import STLAlarmHub
 from .const import CONF_PANEL, DOMAIN
+from .coordinator import PANEL_CONTEXT, STLDataUpdateCoordinator
+from .models import STLPanelSnapshot
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -31,7 +30,7 @@ async def async_setup_entry(
     """Set entry for Alarm Panel."""
 
     stl_hub: STLAlarmHub = hass.data[DOMAIN][entry.entry_id]["api"]
-    coordinator: DataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id][
+    coordinator: STLDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id][
         "coordinator"
     ]
     panel_id: str = entry.data[CONF_PANEL]
@@ -39,33 +38,66 @@ async def async_setup_entry(
         key=panel_id, name=f"Alarm Panel {panel_id}"
     )
     async_add_entities([STLAlarmPanel(stl_hub, coordinator, description)])
+    known_partitions: set[int] = set()
+
+    @callback
+    def _async_add_partitions() -> None:
+        """Add an alarm panel for each further partition not added yet."""
+        entities = []
+        for partition in coordinator.data.partitions[1:]:
+            if partition.id in known_partitions:
+                continue
+            known_partitions.add(partition.id)
+            description = AlarmControlPanelEntityDescription(
+                key=f"{panel_id}_{partition.id}",
+                name=f"Alarm Panel {panel_id} Partition {partition.id}",
+            )
+            entities.append(
+                STLAlarmPanel(stl_hub, coordinator, description, partition.id)
+            )
+        if entities:
+            async_add_entities(entities)
+
+    _async_add_partitions()
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_partitions))
 
 
 class STLAlarmPanel(CoordinatorEntity, AlarmControlPanelEntity):
-    """STL Alarm Panel."""
+    """STL Alarm Panel of a partition.
+
+    Without a partition id the panel follows the first partition reported,
+    which is the whole panel, id -1, when the panel is not partitioned.
+    """
 
     def __init__(
         self,
         hub: STLAlarmHub,
-        coordinator: DataUpdateCoordinator,
+        coordinator: STLDataUpdateCoordinator,
         description: AlarmControlPanelEntityDescription,
+        partition_id: int | None = None,
     ) -> None:
         """Initizialize STL Alarm Panel."""
         self._hub = hub
-        super().__init__(coordinator)
+        self._partition_id = partition_id
+        super().__init__(coordinator, PANEL_CONTEXT)
         self._attr_name = description.name
         self._attr_unique_id = f"stl_panel_{str(description.key)}"
-        self._attr_state = self._hub.alarm_state
-        self._attr_changed_by = self._hub.alarm_changed_by
         self._attr_code_arm_required = False
         self._attr_code_format = None
         self._attr_supported_features = SUPPORT_ALARM_ARM_HOME | SUPPORT_ALARM_ARM_AWAY
-        self._state: str = STATE_ALARM_PENDING
-        self._changed_by: str = "unknown"
         self._displayname = self._hub.alarm_displayname
-        self._isonline = self._hub.alarm_isonline
-        self._isready = self._hub.alarm_ready
         self._panel_id = self._hub.alarm_id
+        self._optimistic_state: str | None = None
+        self._remove_command_listener: CALLBACK_TYPE | None = None
+        self._update_from_snapshot(coordinator.data)
+
+    @property
+    def available(self) -> bool:
+        """Return if the partition is known to the panel."""
+        return super().available and (
+            self._partition_id is None
+            or self.coordinator.data.partition(self._partition_id) is not None
+        )
 
     @property
     def device_info(self) -> DeviceInfo:
@@ -87,28 +119,106 @@ class STLAlarmPanel(CoordinatorEntity, AlarmControlPanelEntity):
             "Is Online": self._isonline,
             "Is Ready": self._isready,
             "Serial": self._panel_id,
+            "Partition": self._partition.id if self._partition else None,
+            "Last event": self._last_event,
+            **self.coordinator.stale_attributes,
         }
 
+    def _update_from_snapshot(self, snapshot: STLPanelSnapshot) -> None:
+        """Update attributes from a panel snapshot."""
+        if self._partition_id is None:
+            partition = snapshot.partitions[0] if snapshot.partitions else None
+        else:
+            partition = snapshot.partition(self._partition_id)
+        self._partition = partition
+        if partition is not None:
+            self._attr_state = partition.alarm_state
+            self._isready = partition.is_ready
+        else:
+            self._attr_state = snapshot.alarm_state
+            self._isready = snapshot.is_ready
+        self._attr_changed_by = snapshot.changed_by
+        self._isonline = snapshot.is_online
+        self._last_event = snapshot.last_event
+        if self._optimistic_state is not None:
+            self._attr_state = self._optimistic_state
+
     async def async_alarm_arm_home(self, code=None) -> None:
         """Alarm home."""
         command = "partial"
-        await self._hub.triggeralarm(command, code=code)
+        await self._async_send_command(command, code, STATE_ALARM_ARMING)
 
     async def async_alarm_disarm(self, code=None) -> None:
         """Alarm off."""
         command = "disarm"
-        await self._hub.triggeralarm(command, code=code)
+        await self._async_send_command(command, code, STATE_ALARM_DISARMING)
 
     async def async_alarm_arm_away(self, code=None) -> None:
         """Alarm away."""
         command = "full"
-        await self._hub.triggeralarm(command, code=code)
+        await self._async_send_command(command, code, STATE_ALARM_ARMING)
+
+    @property
+    def _target_partition(self) -> int:
+        """Return id of the partition commands are sent to."""
+        return self._partition.id if self._partition else -1
+
+    async def _async_send_command(self, command, code, optimistic_state) -> None:
+        """Send command, showing an optimistic state until it is handled.
+
+        Once the panel reports the command succeeded a refresh is requested
+        from the coordinator, debounced with other requests, and the
+        optimistic state is kept until status includes the command.
+        Otherwise it is rolled back.
+        """
+        self._optimistic_state = optimistic_state
+        self._attr_state = optimistic_state
+        self.async_write_ha_state()
+        try:
+            succeeded = await self._hub.triggeralarm(
+                command, code=code, partition=self._target_partition
+            )
+        except BaseException:
+            self._async_end_optimistic_state()
+            raise
+        # Commands for the state the panel is in are dropped, none pending
+        if not succeeded or not self._hub.command_pending(self._target_partition):
+            self._async_end_optimistic_state()
+            return
+        if self._remove_command_listener is None:
+            self._remove_command_listener = self.coordinator.async_add_listener(
+                self._async_handle_command_refresh
+            )
+        await self.coordinator.async_request_refresh()
+
+    @callback
+    def _async_handle_command_refresh(self) -> None:
+        """End the optimistic state once a refresh includes the command."""
+        if self.coordinator.last_update_success and self._hub.command_pending(
+            self._target_partition
+        ):
+            return
+        self._async_end_optimistic_state()
+
+    @callback
+    def _async_end_optimistic_state(self) -> None:
+        """Show the state of the panel again."""
+        if self._remove_command_listener is not None:
+            self._remove_command_listener()
+            self._remove_command_listener = None
+        self._optimistic_state = None
+        self._update_from_snapshot(self.coordinator.data)
+        self.async_write_ha_state()
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Stop waiting for a command when removed."""
+        await super().async_will_remove_from_hass()
+        if self._remove_command_listener is not None:
+            self._remove_command_listener()
+            self._remove_command_listener = None
 
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
-        self._attr_state = self._hub.alarm_state
-        self._attr_changed_by = self._hub.alarm_changed_by
-        self._isonline = self._hub.alarm_isonline
-        self._isready = self._hub.alarm_ready
+        self._update_from_snapshot(self.coordinator.data)
         self.async_write_ha_state()
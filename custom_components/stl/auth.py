@@ -0,0 +1,275 @@
+"""Account sessions for STL integration."""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from collections.abc import Awaitable, Callable, Hashable
+from contextlib import nullcontext
+from functools import partial
+import logging
+from typing import Any
+
+import aiohttp
+from aiohttp import ClientSession
+import async_timeout
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import UpdateFailed
+from homeassistant.util import slugify
+
+from .const import (
+    DATA_ACCOUNTS,
+    DOMAIN,
+    STORAGE_KEY_ACCOUNT,
+    STORAGE_VERSION,
+    URL_LOGIN,
+    URL_PANEL_LOGIN,
+)
+from .fleet import STLFleetScheduler, async_get_fleet
+from .retry import STLCircuitBreaker
+
+_LOGGER = logging.getLogger(__name__)
+
+TOKEN_SAVE_DELAY = 1
+LOGIN_USER = "user"
+
+
+def async_get_account(
+    hass: HomeAssistant,
+    username: str,
+    password: str,
+    app_id: str,
+    websession: ClientSession,
+) -> STLAccount:
+    """Return the shared session for an account, creating it if needed."""
+    accounts: dict[tuple[str, str], STLAccount] = hass.data[DOMAIN].setdefault(
+        DATA_ACCOUNTS, {}
+    )
+    key = (username, app_id)
+    if (account := accounts.get(key)) is None:
+        account = accounts[key] = STLAccount(
+            Store(hass, STORAGE_VERSION, account_storage_key(username, app_id)),
+            username,
+            password,
+            app_id,
+            websession,
+            async_get_fleet(hass),
+        )
+    return account
+
+
+def account_storage_key(username: str, app_id: str) -> str:
+    """Return storage key for an account."""
+    return STORAGE_KEY_ACCOUNT.format(slugify(f"{username}_{app_id}"))
+
+
+class STLAccount:
+    """Session layer shared by all panels of an account.
+
+    One user token is kept per account and one session token per panel.
+    Only one login runs at a time for the user and for each panel, every
+    caller needing a token while a login is in flight shares its result.
+    Tokens are persisted so a restart can reuse them instead of logging in
+    again. Identical concurrent reads are coalesced into one request.
+    Logins go through the circuit breaker and fleet scheduler of requests.
+    """
+
+    def __init__(
+        self,
+        store: Store,
+        username: str,
+        password: str,
+        app_id: str,
+        websession: ClientSession,
+        fleet: STLFleetScheduler | None = None,
+    ) -> None:
+        """Initialize account."""
+        self._store = store
+        self._username = username
+        self._password = password
+        self._app_id = app_id
+        self._websession = websession
+        self._fleet = fleet
+        self._timeout: int = 15
+        self._user_token: str | None = None
+        self._session_tokens: dict[str, str] = {}
+        self._logins: dict[Hashable, asyncio.Task] = {}
+        self._reads: dict[Hashable, asyncio.Task] = {}
+        self._loaded = False
+        self.entries: set[str] = set()
+        self.logins: Counter = Counter()
+        self.breaker = STLCircuitBreaker()
+
+    async def async_load(self) -> None:
+        """Load persisted tokens once."""
+        if self._loaded:
+            return
+        self._loaded = True
+        if data := await self._store.async_load():
+            self._user_token = data.get("user_token")
+            self._session_tokens.update(data.get("session_tokens", {}))
+
+    def seed(self, panel_id: str, user_token: str, session_token: str) -> None:
+        """Use tokens already obtained, for example by the config flow."""
+        self._user_token = user_token
+        self._session_tokens[panel_id] = session_token
+        self._store.async_delay_save(self._data_to_save, TOKEN_SAVE_DELAY)
+
+    async def async_get_tokens(self, panel_id: str, code: str) -> tuple[str, str]:
+        """Return user and session token for a panel, logging in if needed."""
+        if not self._user_token:
+            await self._single_flight(self._logins, None, self._async_user_login)
+        if session_token := self._session_tokens.get(panel_id):
+            return self._user_token, session_token
+
+        session_token = await self._single_flight(
+            self._logins, panel_id, lambda: self._async_panel_login(panel_id, code)
+        )
+        return self._user_token, session_token
+
+    def invalidate(self, panel_id: str, session_token: str) -> None:
+        """Drop a session token rejected by the API.
+
+        Tokens already replaced by a newer login are left untouched, so
+        concurrent failures of the same stale token only cause one login.
+        """
+        if self._session_tokens.get(panel_id) != session_token:
+            return
+        del self._session_tokens[panel_id]
+        self._store.async_delay_save(self._data_to_save, TOKEN_SAVE_DELAY)
+
+    def panel_logins(self, panel_id: str) -> int:
+        """Return number of logins made on behalf of a panel and its account."""
+        return self.logins[LOGIN_USER] + self.logins[panel_id]
+
+    async def async_coalesce(
+        self, key: Hashable, request: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Join an identical read already in flight or start a new one."""
+        return await self._single_flight(self._reads, key, request)
+
+    async def async_remove_panel(self, panel_id: str) -> None:
+        """Forget the session of a removed panel."""
+        await self.async_load()
+        if self._session_tokens.pop(panel_id, None) is None:
+            return
+        if self._session_tokens:
+            await self._store.async_save(self._data_to_save())
+        else:
+            await self._store.async_remove()
+
+    async def _single_flight(
+        self,
+        tasks: dict[Hashable, asyncio.Task],
+        key: Hashable,
+        factory: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Run factory at most once concurrently per key."""
+        if (task := tasks.get(key)) is None:
+            task = tasks[key] = asyncio.create_task(factory())
+            task.add_done_callback(partial(self._single_flight_done, tasks, key))
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _single_flight_done(
+        tasks: dict[Hashable, asyncio.Task], key: Hashable, done: asyncio.Task
+    ) -> None:
+        """Forget a finished task, its callers may all have been cancelled."""
+        if tasks.get(key) is done:
+            tasks.pop(key)
+        if not done.cancelled():
+            done.exception()
+
+    async def _async_user_login(self) -> str:
+        """Login the account and return user token."""
+        response = await self._post(
+            URL_LOGIN,
+            {
+                "email": self._username,
+                "password": self._password,
+                "app_id": self._app_id,
+            },
+        )
+        self._user_token = response["user_token"]
+        self.logins[LOGIN_USER] += 1
+        _LOGGER.debug("Logged in to STL")
+        return self._user_token
+
+    async def _async_panel_login(self, panel_id: str, code: str) -> str:
+        """Login to a panel and return its session token."""
+        retried = False
+        while True:
+            if not (user_token := self._user_token):
+                user_token = await self._single_flight(
+                    self._logins, None, self._async_user_login
+                )
+            try:
+                response = await self._post(
+                    URL_PANEL_LOGIN,
+                    {
+                        "user_code": code,
+                        "app_type": "com.visonic.PowerMaxApp",
+                        "app_id": self._app_id,
+                        "panel_serial": panel_id,
+                    },
+                    user_token,
+                )
+            except UpdateFailed:
+                if retried or self.breaker.is_open:
+                    raise
+                # The user token may have expired, login the account again
+                retried = True
+                if self._user_token == user_token:
+                    self._user_token = None
+                continue
+
+            self._session_tokens[panel_id] = response["session_token"]
+            self.logins[panel_id] += 1
+            self._store.async_delay_save(self._data_to_save, TOKEN_SAVE_DELAY)
+            _LOGGER.debug("Logged in to panel %s", panel_id)
+            return self._session_tokens[panel_id]
+
+    async def _post(self, url: str, json_data: dict, user_token=None) -> dict:
+        """Post a login request and return its response."""
+
+        self.breaker.before_request()
+        message_headers = {"User-Token": user_token} if user_token else None
+        slot = self._fleet.request_slot() if self._fleet is not None else nullcontext()
+        try:
+            async with slot:
+                with async_timeout.timeout(self._timeout):
+                    response = await self._websession.post(
+                        url, headers=message_headers, json=json_data
+                    )
+            if response.status == 429 or response.status >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            if response.status in (200, 204):
+                return await response.json()
+            _LOGGER.error("Login to %s returned %s", url, response.status)
+
+        except aiohttp.ClientConnectorError as error:
+            self.breaker.record_failure()
+            _LOGGER.error("ClientError connecting to API: %s ", error, exc_info=True)
+
+        except aiohttp.ContentTypeError as error:
+            _LOGGER.error("ContentTypeError connecting to API: %s ", error)
+
+        except aiohttp.ClientError as error:
+            self.breaker.record_failure()
+            _LOGGER.error("ClientError connecting to API: %s ", error)
+
+        except asyncio.TimeoutError:
+            self.breaker.record_failure()
+            _LOGGER.error("Timed out when connecting to API")
+
+        raise UpdateFailed(f"Could not login to {url}")
+
+    def _data_to_save(self) -> dict:
+        """Return data to persist."""
+        return {
+            "user_token": self._user_token,
+            "session_tokens": self._session_tokens,
+        }
@@ -10,14 +10,12 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import (
-    CoordinatorEntity,
-    DataUpdateCoordinator,
-)
-from homeassistant.const import STATE_ON
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .__init__ import STLAlarmHub
 from .const import DOMAIN
+from .coordinator import STLDataUpdateCoordinator
+from .models import STLPanelSnapshot
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -28,18 +26,30 @@ async def async_setup_entry(
     """Set entry for Alarm Panel."""
 
     stl_hub: STLAlarmHub = hass.data[DOMAIN][entry.entry_id]["api"]
-    coordinator: DataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id][
+    coordinator: STLDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id][
         "coordinator"
     ]
-    add_entities: list = []
-    devices: list = await stl_hub.get_door_sensors()
-    for device in devices:
-        devicename = await stl_hub.get_door_sensor_names(device)
-        description = BinarySensorEntityDescription(
-            key=device, name=devicename, device_class=DEVICE_CLASS_DOOR
-        )
-        add_entities.append(STLBinarySensor(stl_hub, coordinator, description))
-    async_add_entities(add_entities)
+    known_zones: set[str] = set()
+
+    @callback
+    def _async_add_zones() -> None:
+        """Add entities for zones not seen before."""
+        snapshot: STLPanelSnapshot = coordinator.data
+        add_entities: list = []
+        for zone in snapshot.zones.values():
+            if zone.id in known_zones:
+                continue
+            known_zones.add(zone.id)
+            description = BinarySensorEntityDescription(
+                key=zone.id, name=zone.name, device_class=DEVICE_CLASS_DOOR
+            )
+            add_entities.append(STLBinarySensor(stl_hub, coordinator, description))
+        if add_entities:
+            async_add_entities(add_entities)
+
+    _async_add_zones()
+    # Zones may be restored from storage, add any found by later updates
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_zones))
 
 
 class STLBinarySensor(CoordinatorEntity, BinarySensorEntity):
@@ -48,18 +58,16 @@ class STLBinarySensor(CoordinatorEntity, BinarySensorEntity):
     def __init__(
         self,
         hub: STLAlarmHub,
-        coordinator: DataUpdateCoordinator,
+        coordinator: STLDataUpdateCoordinator,
         description: BinarySensorEntityDescription,
     ) -> None:
         """Initizialize STL Alarm Panel."""
         self._hub = hub
-        super().__init__(coordinator)
+        super().__init__(coordinator, description.key)
         self._attr_name = description.name
         self._attr_unique_id = f"stl_door_{str(description.key)}"
         self.entity_description = description
-        self._attr_is_on = bool(
-            self._hub.get_doorsensor_states[description.key] == STATE_ON
-        )
+        self._update_from_snapshot(coordinator.data)
 
     @property
     def device_info(self) -> DeviceInfo:
@@ -73,10 +81,26 @@ class STLBinarySensor(CoordinatorEntity, BinarySensorEntity):
             "via_device": (DOMAIN, f"visonic_{str(self._hub.alarm_id)}"),
         }
 
+    @property
+    def available(self) -> bool:
+        """Return if entity is available."""
+        return (
+            super().available
+            and self.entity_description.key in self.coordinator.data.zones
+        )
+
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        """Return since when the state is stale, if it is."""
+        return self.coordinator.stale_attributes or None
+
+    def _update_from_snapshot(self, snapshot: STLPanelSnapshot) -> None:
+        """Update state from a panel snapshot."""
+        if zone := snapshot.zones.get(self.entity_description.key):
+            self._attr_is_on = zone.is_open
+
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
-        self._attr_is_on = bool(
-            self._hub.get_doorsensor_states[self.entity_description.key] == STATE_ON
-        )
+        self._update_from_snapshot(self.coordinator.data)
         self.async_write_ha_state()
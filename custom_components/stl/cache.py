@@ -0,0 +1,65 @@
+"""Expiry of cached endpoints for STL integration."""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from time import monotonic
+
+from .const import CACHE_FIRST_FETCH_SPREAD
+
+
+class STLCacheExpiry:
+    """Expiry of slow moving endpoints fetched once per time to live.
+
+    Their parsed data is kept by the hub, only when each endpoint needs to
+    be fetched again is tracked here.
+    """
+
+    def __init__(self, ttls: Mapping[str, float]) -> None:
+        """Initialize expiry with the time to live of each cached url."""
+        self._ttls = dict(ttls)
+        self._expires: dict[str, float] = {}
+        self._deferred: dict[str, float] = {}
+
+    def __contains__(self, url: object) -> bool:
+        """Return if url is cached."""
+        return url in self._ttls
+
+    def renew(self, url: str) -> None:
+        """Expire url one time to live from now, after fetching it."""
+        self._expires[url] = monotonic() + self._ttls[url]
+        self._deferred.pop(url, None)
+
+    def spread(self, fraction: float, *urls: str) -> None:
+        """Delay first fetches of urls by a fraction of their time to live."""
+        now = monotonic()
+        for url in urls:
+            if url not in self._expires:
+                self._expires[url] = now + fraction * min(
+                    self._ttls[url], CACHE_FIRST_FETCH_SPREAD
+                )
+
+    def defer(self, url: str, delay: float) -> None:
+        """Do not report url as expired for a while, after a failed fetch."""
+        self._deferred[url] = monotonic() + delay
+
+    def invalidate(self, *urls: str) -> None:
+        """Expire urls, or every url if none are given."""
+        for url in urls or list(self._ttls):
+            self._expires[url] = 0.0
+            self._deferred.pop(url, None)
+
+    def expired(self) -> set[str]:
+        """Return cached urls that need to be fetched."""
+        now = monotonic()
+        return {url for url in self._ttls if self._expiry(url) <= now}
+
+    def next_expiry_in(self) -> float:
+        """Return seconds until the next cached url needs to be fetched."""
+        if not self._ttls:
+            return float("inf")
+        now = monotonic()
+        return max(0.0, min(self._expiry(url) for url in self._ttls) - now)
+
+    def _expiry(self, url: str) -> float:
+        """Return when url needs to be fetched."""
+        return max(self._expires.get(url, 0.0), self._deferred.get(url, 0.0))
@@ -0,0 +1,64 @@
+"""HTTP client for STL integration."""
+from __future__ import annotations
+
+from types import MappingProxyType
+
+import aiohttp
+from aiohttp import ClientSession
+
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.util import ssl as ssl_util
+
+from .const import (
+    CONNECTION_LIMIT,
+    CONNECTION_LIMIT_PER_HOST,
+    DATA_SESSION,
+    DNS_CACHE_TTL,
+    DOMAIN,
+    KEEPALIVE_TIMEOUT,
+)
+
+BASE_HEADERS = MappingProxyType(
+    {
+        "Content-Type": "application/json",
+        "Connection": "keep-alive",
+        "Accept": "*/*",
+        "User-Agent": "Visonic GO/2.8.62.91 CFNetwork/901.1 Darwin/17.6.0",
+        "Accept-Language": "en-us",
+        "Accept-Encoding": "br, gzip, deflate",
+    }
+)
+
+
+def create_session() -> ClientSession:
+    """Create a client session with its own connection pool for the API.
+
+    Connections are kept alive between polls and DNS lookups are cached,
+    so requests rarely pay for name resolution, connecting or TLS setup.
+    The constant headers are sent by default, callers only add tokens.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=CONNECTION_LIMIT,
+        limit_per_host=CONNECTION_LIMIT_PER_HOST,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        enable_cleanup_closed=True,
+        ssl=ssl_util.client_context(),
+    )
+    return ClientSession(connector=connector, headers=BASE_HEADERS)
+
+
+@callback
+def async_get_session(hass: HomeAssistant) -> ClientSession:
+    """Return the client session shared by all entries, creating it if needed."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (session := domain_data.get(DATA_SESSION)) is None:
+        session = domain_data[DATA_SESSION] = create_session()
+
+        async def _async_close_session(event: Event) -> None:
+            """Close client session."""
+            await session.close()
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, _async_close_session)
+    return session
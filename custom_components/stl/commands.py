@@ -0,0 +1,84 @@
+"""Command queue for STL integration."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Awaitable, Callable
+import logging
+
+from homeassistant.const import (
+    STATE_ALARM_ARMED_AWAY,
+    STATE_ALARM_ARMED_HOME,
+    STATE_ALARM_DISARMED,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+COMMAND_STATES = {
+    "full": STATE_ALARM_ARMED_AWAY,
+    "partial": STATE_ALARM_ARMED_HOME,
+    "disarm": STATE_ALARM_DISARMED,
+}
+
+
+class STLCommandQueue:
+    """Run commands to a panel one at a time, in the order submitted.
+
+    A command identical to the last one queued, or running if none are
+    queued, and for the same partition is merged with it and shares its
+    result. A command arming a partition known to be in that state since
+    it was queued is dropped when its turn comes, disarming is always sent.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str, int], Awaitable[bool]],
+        known_state: Callable[[int, float], str | None],
+    ) -> None:
+        """Initialize queue."""
+        self._send = send
+        self._known_state = known_state
+        self._queue: deque[tuple[str, int, asyncio.Future[bool], float]] = deque()
+        self._worker: asyncio.Task | None = None
+
+    async def submit(self, command: str, partition: int = -1) -> bool:
+        """Queue command and return if the partition reached its state.
+
+        Partition -1 targets all partitions of the panel.
+        """
+        if self._queue and self._queue[-1][:2] == (command, partition):
+            _LOGGER.debug("Merging %s command with the previous one", command)
+            future = self._queue[-1][2]
+        else:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._queue.append((command, partition, future, loop.time()))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        # A caller giving up must not cancel the command for other callers
+        return await asyncio.shield(future)
+
+    async def _run(self) -> None:
+        """Run queued commands."""
+        while self._queue:
+            command, partition, future, queued = self._queue[0]
+            try:
+                if (
+                    command != "disarm"
+                    and self._known_state(partition, queued) == COMMAND_STATES[command]
+                ):
+                    _LOGGER.debug(
+                        "Partition %s already %s, dropping command", partition, command
+                    )
+                    result = True
+                else:
+                    result = await self._send(command, partition)
+            except asyncio.CancelledError:
+                while self._queue:
+                    self._queue.popleft()[2].cancel()
+                raise
+            except Exception as err:  # pylint: disable=broad-except
+                future.set_exception(err)
+            else:
+                future.set_result(result)
+            self._queue.popleft()
@@ -1,20 +1,25 @@
 """Adds config flow for Sector integration."""
+from __future__ import annotations
+
 import logging
 import uuid
 
 import voluptuous as vol
 
 from homeassistant import config_entries, exceptions
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.core import HomeAssistant, callback
 import homeassistant.helpers.config_validation as cv
 
+from .client import async_get_session
 from .const import (
     CONF_APP_ID,
     CONF_CODE,
+    CONF_GRACE_PERIOD,
     CONF_PANEL,
     CONF_PASSWORD,
     CONF_USERNAME,
+    DATA_FLOW_TOKENS,
+    DEFAULT_GRACE_PERIOD,
     DOMAIN,
     URL_LOGIN,
     URL_PANEL_LOGIN,
@@ -40,22 +45,15 @@ async def validate_input(
     app_id: str,
     code: str,
     panel_id: str,
-) -> None:
-    """Validate the user input allows us to connect."""
-
-    message_headers = {
-        "Content-Type": "application/json",
-        "Connection": "keep-alive",
-        "Accept": "*/*",
-        "User-Agent": "Visonic GO/2.8.62.91 CFNetwork/901.1 Darwin/17.6.0",
-        "Accept-Language": "en-us",
-        "Accept-Encoding": "br, gzip, deflate",
-    }
+) -> dict:
+    """Validate the user input allows us to connect.
 
-    websession = async_get_clientsession(hass)
+    Return the obtained tokens so setup does not need to login again.
+    """
+
+    websession = async_get_session(hass)
     login = await websession.post(
         URL_LOGIN,
-        headers=message_headers,
         json={
             "email": username,
             "password": password,
@@ -64,13 +62,12 @@ async def validate_input(
     )
     if login.status in (200, 204):
         token_user = await login.json()
-        message_headers["User-Token"] = token_user["user_token"]
     else:
         raise CannotConnect
 
     session = await websession.post(
         URL_PANEL_LOGIN,
-        headers=message_headers,
+        headers={"User-Token": token_user["user_token"]},
         json={
             "user_code": code,
             "app_type": "com.visonic.PowerMaxApp",
@@ -81,10 +78,14 @@ async def validate_input(
 
     if session.status in (200, 204):
         token_session = await session.json()
-        message_headers["Session-Token"] = token_session["session_token"]
     else:
         raise CannotConnect
 
+    return {
+        "user_token": token_user["user_token"],
+        "session_token": token_session["session_token"],
+    }
+
 
 class STLConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Sector integration."""
@@ -92,6 +93,14 @@ class STLConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
     CONNECTION_CLASS = config_entries.CONN_CLASS_CLOUD_POLL
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> STLOptionsFlow:
+        """Get the options flow for this handler."""
+        return STLOptionsFlow(config_entry)
+
     async def async_step_user(self, user_input=None):
         """Handle the initial step."""
         errors = {}
@@ -104,7 +113,7 @@ class STLConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             panel_id: str = user_input[CONF_PANEL].replace(" ", "")
 
             try:
-                await validate_input(
+                tokens = await validate_input(
                     self.hass, username, password, app_id, code, panel_id
                 )
             except CannotConnect:
@@ -119,6 +128,10 @@ class STLConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             await self.async_set_unique_id(unique_id)
             self._abort_if_unique_id_configured()
 
+            self.hass.data.setdefault(DOMAIN, {}).setdefault(DATA_FLOW_TOKENS, {})[
+                unique_id
+            ] = tokens
+
             return self.async_create_entry(
                 title=unique_id,
                 data={
@@ -137,5 +150,32 @@ class STLConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         )
 
 
+class STLOptionsFlow(config_entries.OptionsFlow):
+    """Handle STL options."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize options flow."""
+        self.config_entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_GRACE_PERIOD,
+                        default=self.config_entry.options.get(
+                            CONF_GRACE_PERIOD, DEFAULT_GRACE_PERIOD
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=86400)),
+                }
+            ),
+        )
+
+
 class CannotConnect(exceptions.HomeAssistantError):
     """Error to indicate we cannot connect."""
@@ -21,7 +21,86 @@ CONF_PASSWORD = "password"
 CONF_APP_ID = "app_id"
 CONF_PANEL = "panel_id"
 CONF_CODE = "code"
+CONF_GRACE_PERIOD = "grace_period"
+
+DEFAULT_GRACE_PERIOD = 300
 
 MIN_SCAN_INTERVAL = 30
+STATUS_SCAN_INTERVAL = MIN_SCAN_INTERVAL
+STATUS_FAST_SCAN_INTERVAL = 5
+STATUS_STABLE_SCAN_INTERVAL = 120
+STATUS_STABLE_AFTER = 1800
+# Doors and windows are reported open by warnings of their devices
+DEVICES_SCAN_INTERVAL = STATUS_SCAN_INTERVAL
+EVENTS_SCAN_INTERVAL = 300
+# Coordinator wake-ups are rounded to whole seconds, polls due this soon are made
+POLL_TOLERANCE = 1
+REFRESH_COOLDOWN = 3
+
+PANEL_INFO_CACHE_TTL = 86400
+ALARMS_CACHE_TTL = 60
+ALERTS_CACHE_TTL = 300
+TROUBLES_CACHE_TTL = 900
+# First fetches of cached endpoints are spread over their time to live, at most
+CACHE_FIRST_FETCH_SPREAD = 300
+
+EVENT_BUFFER_SIZE = 50
+CHANGED_BY_LABELS = ("ARM", "DISMARM")
+
+PROCESS_POLL_DELAY = 0.5
+PROCESS_POLL_MAX_DELAY = 3
+PROCESS_TIMEOUT = 30
+# Status fetched this long before a command was queued tells if it is needed
+COMMAND_STATE_MAX_AGE = 5
+
+REQUEST_RETRIES = 3
+TRACE_BUFFER_SIZE = 200
+STREAM_CHUNK_SIZE = 16384
+BACKOFF_BASE = 1
+BACKOFF_MAX = 30
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 60
+
+CONNECTION_LIMIT = 20
+CONNECTION_LIMIT_PER_HOST = 10
+FLEET_MAX_CONCURRENT_REQUESTS = 8
+# Requests per second of the fleet, per panel registered but at least the minimum
+FLEET_REQUEST_RATE = 5
+FLEET_PANEL_REQUEST_RATE = 0.5
+FLEET_REQUEST_BURST = 20
+# Requests waiting for the fleet are let through in this order
+PRIORITY_COMMAND = 0
+PRIORITY_POLL = 1
+PRIORITY_BACKGROUND = 2
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 60
+
+PLATFORMS = ["alarm_control_panel", "binary_sensor", "sensor"]
+
+STORAGE_VERSION = 1
+STORAGE_KEY_ACCOUNT = DOMAIN + ".{}.account"
+STORAGE_KEY_SNAPSHOT = DOMAIN + ".{}.snapshot"
+
+HISTORY_DB_NAME = "stl_history.db"
+HISTORY_MAX_AGE_DAYS = 365
+HISTORY_PRUNE_INTERVAL = 86400
+
+SERVICE_HISTORY = "history"
+EVENT_HISTORY = DOMAIN + "_history"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_LABEL = "label"
+ATTR_NAME = "name"
+ATTR_LIMIT = "limit"
+ATTR_EVENTS = "events"
+
+SERVICE_PROFILE = "profile"
+ATTR_CYCLES = "cycles"
+PROFILE_STATS_TOP = 50
+PROFILE_MEMORY_TOP = 15
 
-PLATFORMS = ["alarm_control_panel", "binary_sensor"]
+DATA_ACCOUNTS = "accounts"
+DATA_SESSION = "session"
+DATA_HISTORY = "history"
+DATA_FLOW_TOKENS = "flow_tokens"
+DATA_FLEET = "fleet"
@@ -0,0 +1,136 @@
+"""Data update coordinator for STL integration."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .models import STLPanelSnapshot
+from .profiler import STLProfiler
+
+PANEL_CONTEXT = "panel"
+
+
+def changed_contexts(
+    previous: STLPanelSnapshot, current: STLPanelSnapshot
+) -> set[str]:
+    """Return contexts of the panel and zones that differ between snapshots."""
+    changed: set[str] = set()
+    if previous is current:
+        return changed
+    if previous._replace(zones=current.zones) != current:
+        changed.add(PANEL_CONTEXT)
+    if previous.zones is not current.zones:
+        for zone_id, zone in current.zones.items():
+            if previous.zones.get(zone_id) != zone:
+                changed.add(zone_id)
+        changed.update(previous.zones.keys() - current.zones.keys())
+    return changed
+
+
+class STLDataUpdateCoordinator(DataUpdateCoordinator[STLPanelSnapshot]):
+    """Coordinator only notifying entities whose data changed.
+
+    Entities register with the panel context or their zone id as context,
+    listeners without a context are notified on every update.
+
+    Failed updates keep serving the last snapshot as stale data, entities
+    only become unavailable when updates keep failing for a grace period.
+    """
+
+    _notified: tuple[STLPanelSnapshot | None, bool, bool] = (None, True, False)
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        logger: logging.Logger,
+        *,
+        grace_period: timedelta = timedelta(0),
+        **kwargs: Any,
+    ) -> None:
+        """Initialize coordinator."""
+        super().__init__(hass, logger, **kwargs)
+        self.grace_period = grace_period
+        self.stale_since: datetime | None = None
+        self.profiler: STLProfiler | None = None
+
+    @property
+    def stale_attributes(self) -> dict:
+        """Return state attributes telling since when data is stale."""
+        if self.stale_since is None:
+            return {}
+        return {"Stale since": self.stale_since.isoformat()}
+
+    async def _async_refresh(self, *args: Any, **kwargs: Any) -> None:
+        """Refresh data, profiling the cycle if requested."""
+        if (profiler := self.profiler) is None or profiler.active:
+            await super()._async_refresh(*args, **kwargs)
+            return
+        profiler.begin_cycle()
+        try:
+            await super()._async_refresh(*args, **kwargs)
+        finally:
+            profiler.end_cycle()
+            if profiler.done:
+                self.profiler = None
+
+    async def _async_update_data(self) -> STLPanelSnapshot:
+        """Fetch data, serving the last snapshot during the grace period."""
+        try:
+            if self.profiler is not None:
+                with self.profiler.phase("fetch"):
+                    data = await super()._async_update_data()
+            else:
+                data = await super()._async_update_data()
+        except UpdateFailed as error:
+            if (
+                self.data is None
+                or not self.last_update_success
+                or not self.grace_period
+            ):
+                raise
+            now = dt_util.utcnow()
+            if self.stale_since is None:
+                self.stale_since = now
+                self.logger.warning(
+                    "Serving last known state of %s until %s: %s",
+                    self.name,
+                    now + self.grace_period,
+                    error,
+                )
+            if now - self.stale_since >= self.grace_period:
+                raise
+            return self.data
+        self.stale_since = None
+        return data
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update listeners affected by the latest update."""
+        if self.profiler is not None:
+            with self.profiler.phase("listeners"):
+                self._async_update_changed_listeners()
+        else:
+            self._async_update_changed_listeners()
+
+    @callback
+    def _async_update_changed_listeners(self) -> None:
+        """Update listeners affected by the latest update."""
+        previous, was_success, was_stale = self._notified
+        is_stale = self.stale_since is not None
+        self._notified = (self.data, self.last_update_success, is_stale)
+
+        if previous is None or self.data is None or (
+            was_success != self.last_update_success or was_stale != is_stale
+        ):
+            super().async_update_listeners()
+            return
+
+        changed = changed_contexts(previous, self.data)
+        for update_callback, context in list(self._listeners.values()):
+            if context is None or context in changed:
+                update_callback()
@@ -0,0 +1,54 @@
+"""Diagnostics for STL integration."""
+from __future__ import annotations
+
+from dataclasses import asdict
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .__init__ import STLAlarmHub
+from .const import (
+    CONF_APP_ID,
+    CONF_CODE,
+    CONF_PANEL,
+    CONF_PASSWORD,
+    CONF_USERNAME,
+    DOMAIN,
+)
+from .coordinator import STLDataUpdateCoordinator
+
+TO_REDACT = {CONF_USERNAME, CONF_PASSWORD, CONF_APP_ID, CONF_CODE, CONF_PANEL}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics of a config entry, with its recent requests."""
+    stl_hub: STLAlarmHub = hass.data[DOMAIN][entry.entry_id]["api"]
+    coordinator: STLDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id][
+        "coordinator"
+    ]
+    snapshot = coordinator.data
+    return {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": coordinator.update_interval.total_seconds()
+            if coordinator.update_interval
+            else None,
+            "stale_since": coordinator.stale_since,
+        },
+        "status": {
+            "state": snapshot.state,
+            "status": snapshot.status,
+            "is_online": snapshot.is_online,
+            "partitions": [partition._asdict() for partition in snapshot.partitions],
+        },
+        "metrics": stl_hub.metrics.as_dict(),
+        "traces": [asdict(trace) for trace in stl_hub.traces],
+    }
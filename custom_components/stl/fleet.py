@@ -0,0 +1,171 @@
+"""Scheduling of requests across all panels of the STL integration."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from time import monotonic
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import (
+    DATA_FLEET,
+    DOMAIN,
+    FLEET_MAX_CONCURRENT_REQUESTS,
+    FLEET_PANEL_REQUEST_RATE,
+    FLEET_REQUEST_BURST,
+    FLEET_REQUEST_RATE,
+    PRIORITY_POLL,
+)
+
+
+@callback
+def async_get_fleet(hass: HomeAssistant) -> STLFleetScheduler:
+    """Return the scheduler shared by all entries, creating it if needed."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (fleet := domain_data.get(DATA_FLEET)) is None:
+        fleet = domain_data[DATA_FLEET] = STLFleetScheduler(
+            FLEET_MAX_CONCURRENT_REQUESTS,
+            FLEET_REQUEST_RATE,
+            FLEET_REQUEST_BURST,
+            FLEET_PANEL_REQUEST_RATE,
+        )
+    return fleet
+
+
+class STLFleetScheduler:
+    """Spread polls of all panels in time and bound requests to the cloud.
+
+    Each panel gets a phase, evenly spread over the panels registered, and
+    the polls of its hub are moved to that phase of their interval. Panels
+    polling at the same interval so take turns instead of firing together.
+    The coordinator wakes up on whole seconds plus a fraction of its own,
+    so phases closer than a second apart may still overlap.
+
+    Requests from all panels share a limit of concurrent requests and a
+    token bucket limiting their rate, which grows with the number of panels
+    registered. Waiting requests are let through by priority: commands
+    first, then the polls an update waits for and background fetches last.
+    """
+
+    def __init__(
+        self, max_concurrent: int, rate: float, burst: int, panel_rate: float = 0.0
+    ) -> None:
+        """Initialize scheduler."""
+        self._panels: list[str] = []
+        self._max_concurrent = max_concurrent
+        self._min_rate = rate
+        self._panel_rate = panel_rate
+        self._rate = rate
+        self._burst = burst
+        self._active = 0
+        self._tokens = float(burst)
+        self._refilled = monotonic()
+        # Waiting requests of each priority
+        self._waiters: tuple[deque[asyncio.Future], ...] = (deque(), deque(), deque())
+        self._timer: asyncio.TimerHandle | None = None
+
+    @callback
+    def register(self, key: str) -> Callable[[], None]:
+        """Give a panel a phase, return a callback to unregister it."""
+        self._panels.append(key)
+        self._update_rate()
+
+        @callback
+        def _unregister() -> None:
+            self._panels.remove(key)
+            self._update_rate()
+
+        return _unregister
+
+    def _update_rate(self) -> None:
+        """Size the rate for the panels registered."""
+        self._refill()
+        self._rate = max(self._min_rate, len(self._panels) * self._panel_rate)
+
+    def phase(self, key: str) -> float:
+        """Return phase of a panel, as a fraction of its poll interval."""
+        if key not in self._panels:
+            return 0.0
+        return self._panels.index(key) / len(self._panels)
+
+    def align(self, key: str, when: float, period: float) -> float:
+        """Return monotonic time moved to the nearest poll at a panel's phase.
+
+        Polls are placed on a grid of the period, shared by all panels
+        polling at that interval. The time moves by at most half a period,
+        so a panel keeps its interval once it is in phase.
+        """
+        if period <= 0 or len(self._panels) < 2:
+            return when
+        offset = self.phase(key) * period
+        return round((when - offset) / period) * period + offset
+
+    @asynccontextmanager
+    async def request_slot(
+        self, priority: int = PRIORITY_POLL
+    ) -> AsyncIterator[None]:
+        """Wait for a request to be allowed, lower priorities first."""
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._dispatch()
+
+    async def _acquire(self, priority: int) -> None:
+        """Wait for a concurrent request and a token."""
+        waiters = self._waiters[priority]
+        if not any(self._waiters[: priority + 1]) and self._take():
+            return
+        future = asyncio.get_running_loop().create_future()
+        waiters.append(future)
+        # No request may end to let it through, start waiting for a token
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted while being cancelled, hand it to the next waiter
+                self._active -= 1
+                self._dispatch()
+            raise
+
+    def _take(self) -> bool:
+        """Take a concurrent request and a token if both are available."""
+        if self._active >= self._max_concurrent:
+            return False
+        self._refill()
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        self._active += 1
+        return True
+
+    def _refill(self) -> None:
+        """Add the tokens earned since the last refill."""
+        now = monotonic()
+        self._tokens = min(
+            self._burst, self._tokens + (now - self._refilled) * self._rate
+        )
+        self._refilled = now
+
+    def _dispatch(self) -> None:
+        """Let waiting requests through, by priority."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for waiters in self._waiters:
+            while waiters:
+                if waiters[0].done():
+                    waiters.popleft()
+                    continue
+                if not self._take():
+                    if self._active < self._max_concurrent and self._timer is None:
+                        # Out of tokens, retry once the next one is refilled
+                        self._timer = asyncio.get_running_loop().call_later(
+                            (1 - self._tokens) / self._rate, self._dispatch
+                        )
+                    return
+                waiters.popleft().set_result(None)
@@ -0,0 +1,199 @@
+"""Local event history for STL integration."""
+from __future__ import annotations
+
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+import logging
+import os
+import sqlite3
+import threading
+from time import monotonic
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.storage import STORAGE_DIR
+
+from .const import (
+    DATA_HISTORY,
+    DOMAIN,
+    HISTORY_DB_NAME,
+    HISTORY_MAX_AGE_DAYS,
+    HISTORY_PRUNE_INTERVAL,
+)
+from .models import STLEvent
+
+_LOGGER = logging.getLogger(__name__)
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS events (
+        panel_id TEXT NOT NULL,
+        event_id INTEGER,
+        label TEXT NOT NULL,
+        name TEXT,
+        datetime TEXT
+    )""",
+    # NULL values are distinct in UNIQUE constraints, events without id or
+    # time are deduplicated by an index on their values instead
+    """CREATE UNIQUE INDEX IF NOT EXISTS ix_events_unique
+        ON events (panel_id, COALESCE(event_id, -1), COALESCE(datetime, ''))""",
+    "CREATE INDEX IF NOT EXISTS ix_events_datetime ON events (panel_id, datetime)",
+    """CREATE INDEX IF NOT EXISTS ix_events_label
+        ON events (panel_id, label, datetime)""",
+    "CREATE INDEX IF NOT EXISTS ix_events_name ON events (panel_id, name, datetime)",
+)
+
+
+@callback
+def async_get_history(hass: HomeAssistant) -> STLEventHistory:
+    """Return the event history shared by all entries, creating it if needed."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if (history := domain_data.get(DATA_HISTORY)) is None:
+        history = domain_data[DATA_HISTORY] = STLEventHistory(
+            hass, hass.config.path(STORAGE_DIR, HISTORY_DB_NAME)
+        )
+
+        async def _async_close_history(event: Event) -> None:
+            """Close event history."""
+            await history.async_close()
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_close_history)
+    return history
+
+
+class STLEventHistory:
+    """Panel events stored in a local SQLite database.
+
+    Events are indexed by time, label and user per panel so history
+    queries do not need the cloud. Database access runs in the executor,
+    serialized by a lock as the connection is shared between threads.
+    """
+
+    def __init__(self, hass: HomeAssistant, path: str) -> None:
+        """Initialize history."""
+        self._hass = hass
+        self._path = path
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+        self._pruned_at: float | None = None
+
+    async def async_add(self, panel_id: str, events: Iterable[STLEvent]) -> None:
+        """Store events of a panel, pruning old events once in a while."""
+        rows = [(panel_id, *event) for event in events]
+        prune = (
+            self._pruned_at is None
+            or monotonic() - self._pruned_at > HISTORY_PRUNE_INTERVAL
+        )
+        if prune:
+            self._pruned_at = monotonic()
+        try:
+            await self._hass.async_add_executor_job(self._add, rows, prune)
+        except sqlite3.Error as error:
+            _LOGGER.error("Could not store events of panel %s: %s", panel_id, error)
+
+    async def async_query(
+        self,
+        panel_id: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        label: str | None = None,
+        name: str | None = None,
+        limit: int = 100,
+    ) -> list[dict]:
+        """Return matching events, most recent first."""
+        clauses = []
+        params: list = []
+        for clause, value in (
+            ("panel_id = ?", panel_id),
+            ("datetime >= ?", start and start.strftime(DATETIME_FORMAT)),
+            ("datetime <= ?", end and end.strftime(DATETIME_FORMAT)),
+            ("label = ?", label),
+            ("name = ?", name),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        query = "SELECT panel_id, event_id, label, name, datetime FROM events"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY datetime DESC LIMIT ?"
+        params.append(limit)
+        rows = await self._hass.async_add_executor_job(self._execute, query, params)
+        return [
+            {
+                "panel_id": row[0],
+                "id": row[1],
+                "label": row[2],
+                "name": row[3],
+                "datetime": row[4],
+            }
+            for row in rows
+        ]
+
+    async def async_last_user(
+        self, panel_id: str, labels: Iterable[str]
+    ) -> str | None:
+        """Return user of the most recent event of a panel with one of labels."""
+        labels = tuple(labels)
+        rows = await self._hass.async_add_executor_job(
+            self._execute,
+            "SELECT name FROM events WHERE panel_id = ? AND label IN "
+            f"({', '.join('?' * len(labels))}) ORDER BY datetime DESC LIMIT 1",
+            [panel_id, *labels],
+        )
+        return rows[0][0] if rows else None
+
+    async def async_remove_panel(self, panel_id: str) -> None:
+        """Remove events of a panel."""
+        await self._hass.async_add_executor_job(
+            self._execute, "DELETE FROM events WHERE panel_id = ?", [panel_id]
+        )
+
+    async def async_close(self) -> None:
+        """Close the database."""
+        await self._hass.async_add_executor_job(self._close)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return connection, opening the database if needed."""
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            self._connection = sqlite3.connect(self._path, check_same_thread=False)
+            self._connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            for statement in SCHEMA:
+                self._connection.execute(statement)
+            self._connection.commit()
+        return self._connection
+
+    def _add(self, rows: list[tuple], prune: bool) -> None:
+        """Insert events not stored yet and prune expired ones."""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.executemany(
+                    "INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?)", rows
+                )
+                if prune:
+                    cutoff = datetime.now() - timedelta(days=HISTORY_MAX_AGE_DAYS)
+                    connection.execute(
+                        "DELETE FROM events WHERE datetime < ?",
+                        (cutoff.strftime(DATETIME_FORMAT),),
+                    )
+            if prune:
+                # Return pages freed by pruning to the file system
+                connection.execute("PRAGMA incremental_vacuum").fetchall()
+
+    def _execute(self, query: str, params: list) -> list[tuple]:
+        """Execute a statement and return its rows."""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                return connection.execute(query, params).fetchall()
+
+    def _close(self) -> None:
+        """Close connection."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,115 @@
+"""Request metrics for STL integration."""
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import asdict, dataclass, field
+
+from .const import API_URL
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+
+
+def endpoint_name(url: str) -> str:
+    """Return endpoint of an API url without query."""
+    return url.removeprefix(API_URL).split("?", 1)[0]
+
+
+@dataclass
+class STLEndpointMetrics:
+    """Counters for requests to one endpoint."""
+
+    requests: int = 0
+    retries: int = 0
+    client_errors: int = 0
+    server_errors: int = 0
+    network_errors: int = 0
+    timeouts: int = 0
+    latency_total: float = 0.0
+    latency_max: float = 0.0
+    latency_histogram: list[int] = field(
+        default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1)
+    )
+
+    @property
+    def latency_mean(self) -> float | None:
+        """Return mean latency of answered requests."""
+        answered = sum(self.latency_histogram)
+        if not answered:
+            return None
+        return self.latency_total / answered
+
+    def record(self, latency: float, status: int) -> None:
+        """Record an answered request."""
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        self.latency_histogram[bisect_left(LATENCY_BUCKETS, latency)] += 1
+        if 400 <= status < 500:
+            self.client_errors += 1
+        elif status >= 500:
+            self.server_errors += 1
+
+
+@dataclass
+class STLRequestTrace:
+    """Trace of one attempt of a request.
+
+    Start is wall clock time the request was sent, wait the seconds it
+    waited for the fleet scheduler and size the bytes of the response.
+    Token refresh tells if a login was needed for the attempt.
+    """
+
+    endpoint: str
+    method: str
+    attempt: int
+    token_refresh: bool
+    start: str | None = None
+    wait: float | None = None
+    duration: float | None = None
+    status: int | None = None
+    size: int | None = None
+    error: str | None = None
+
+
+@dataclass
+class STLRequestMetrics:
+    """Metrics of the requests made by a hub."""
+
+    endpoints: dict[str, STLEndpointMetrics] = field(default_factory=dict)
+    cycles: int = 0
+    cycles_over_deadline: int = 0
+    last_cycle_duration: float | None = None
+    max_cycle_duration: float = 0.0
+
+    def endpoint(self, url: str) -> STLEndpointMetrics:
+        """Return metrics of the endpoint of an url."""
+        name = endpoint_name(url)
+        if (metrics := self.endpoints.get(name)) is None:
+            metrics = self.endpoints[name] = STLEndpointMetrics()
+        return metrics
+
+    def record_cycle(self, duration: float, over_deadline: bool) -> None:
+        """Record a finished update cycle."""
+        self.cycles += 1
+        self.cycles_over_deadline += over_deadline
+        self.last_cycle_duration = duration
+        self.max_cycle_duration = max(self.max_cycle_duration, duration)
+
+    def total(self, counter: str) -> int:
+        """Return a counter summed over all endpoints."""
+        return sum(getattr(metrics, counter) for metrics in self.endpoints.values())
+
+    @property
+    def latency_mean(self) -> float | None:
+        """Return mean latency over all endpoints."""
+        answered = sum(
+            sum(metrics.latency_histogram) for metrics in self.endpoints.values()
+        )
+        if not answered:
+            return None
+        return self.total("latency_total") / answered
+
+    def as_dict(self) -> dict:
+        """Return metrics as a dictionary."""
+        data = asdict(self)
+        data["latency_buckets"] = LATENCY_BUCKETS
+        return data
@@ -0,0 +1,177 @@
+"""Data models for STL integration."""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import NamedTuple
+
+from homeassistant.const import (
+    STATE_ALARM_ARMED_AWAY,
+    STATE_ALARM_ARMED_HOME,
+    STATE_ALARM_ARMING,
+    STATE_ALARM_DISARMED,
+    STATE_ALARM_DISARMING,
+    STATE_ALARM_PENDING,
+)
+
+
+def alarm_state(state: str, status: str) -> str:
+    """Return state of alarm from state and status reported by the panel."""
+
+    if state == "DISARM":
+        return STATE_ALARM_DISARMED
+    if state == "HOME" and status == "EXIT":
+        return STATE_ALARM_ARMING
+    if state == "AWAY" and status == "EXIT":
+        return STATE_ALARM_ARMING
+    if state == "HOME":
+        return STATE_ALARM_ARMED_HOME
+    if state == "AWAY":
+        return STATE_ALARM_ARMED_AWAY
+    if state == "ENTRY_DELAY":
+        return STATE_ALARM_DISARMING
+    return STATE_ALARM_PENDING
+
+
+class STLPartition(NamedTuple):
+    """Partition of a panel, id -1 when the panel is not partitioned."""
+
+    id: int
+    state: str
+    status: str
+    is_ready: bool
+
+    @property
+    def alarm_state(self) -> str:
+        """Return state of alarm of the partition."""
+        return alarm_state(self.state, self.status)
+
+
+class STLZone(NamedTuple):
+    """Door sensor zone."""
+
+    id: str
+    name: str
+    is_open: bool
+
+
+class STLEvent(NamedTuple):
+    """Panel event."""
+
+    id: int | None
+    label: str
+    name: str | None
+    datetime: str | None
+
+    @classmethod
+    def from_api(cls, event: dict) -> STLEvent:
+        """Create event from an /events entry."""
+        return cls(
+            event.get("event"), event["label"], event.get("name"), event.get("datetime")
+        )
+
+
+class STLPanelIssue(NamedTuple):
+    """Alarm, alert or trouble reported by the panel."""
+
+    type: str | None
+    device: str | None
+    location: str | None
+    datetime: str | None
+
+    @classmethod
+    def from_api(cls, item: dict, type_key: str) -> STLPanelIssue:
+        """Create issue from an /alarms, /alerts or /troubles entry."""
+        return cls(
+            item.get(type_key),
+            item.get("device_type"),
+            item.get("location") or item.get("zone_name"),
+            item.get("datetime"),
+        )
+
+
+class STLResponseValidator(NamedTuple):
+    """Validators of the last response from an endpoint."""
+
+    etag: str | None
+    last_modified: str | None
+    digest: bytes
+
+
+class STLPanelSnapshot(NamedTuple):
+    """Immutable state of a panel after an update cycle.
+
+    Parts not fetched in a cycle are carried over from the previous
+    snapshot by identity, so comparing two snapshots is cheap. State,
+    status and readiness of the panel are those of its first partition.
+    """
+
+    state: str = ""
+    status: str = ""
+    is_online: bool = False
+    is_ready: bool = False
+    changed_by: str = ""
+    events: tuple[STLEvent, ...] = ()
+    zones: Mapping[str, STLZone] = MappingProxyType({})
+    alarms: tuple[STLPanelIssue, ...] = ()
+    alerts: tuple[STLPanelIssue, ...] = ()
+    troubles: tuple[STLPanelIssue, ...] = ()
+    partitions: tuple[STLPartition, ...] = ()
+
+    @property
+    def alarm_state(self) -> str:
+        """Return state of alarm."""
+        return alarm_state(self.state, self.status)
+
+    def partition(self, partition_id: int) -> STLPartition | None:
+        """Return partition by id."""
+        for partition in self.partitions:
+            if partition.id == partition_id:
+                return partition
+        return None
+
+    @property
+    def last_event(self) -> str | None:
+        """Return label of the most recent event."""
+        if not self.events:
+            return None
+        return self.events[-1].label
+
+    def as_dict(self) -> dict:
+        """Return snapshot as a JSON serializable dictionary."""
+        return {
+            "state": self.state,
+            "status": self.status,
+            "is_online": self.is_online,
+            "is_ready": self.is_ready,
+            "changed_by": self.changed_by,
+            "events": [list(event) for event in self.events],
+            "zones": [list(zone) for zone in self.zones.values()],
+            "alarms": [list(issue) for issue in self.alarms],
+            "alerts": [list(issue) for issue in self.alerts],
+            "troubles": [list(issue) for issue in self.troubles],
+            "partitions": [list(partition) for partition in self.partitions],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> STLPanelSnapshot:
+        """Create snapshot from a dictionary made by as_dict."""
+        zones = (STLZone(*zone) for zone in data["zones"])
+        # Stored before partitions were kept, the panel state is the partition
+        partitions = data.get("partitions") or [
+            [-1, data["state"], data["status"], data["is_ready"]]
+        ]
+        return cls(
+            data["state"],
+            data["status"],
+            data["is_online"],
+            data["is_ready"],
+            data["changed_by"],
+            tuple(STLEvent(*event) for event in data["events"]),
+            MappingProxyType({zone.id: zone for zone in zones}),
+            *(
+                tuple(STLPanelIssue(*issue) for issue in data.get(key, ()))
+                for key in ("alarms", "alerts", "troubles")
+            ),
+            tuple(STLPartition(*partition) for partition in partitions),
+        )
@@ -0,0 +1,90 @@
+"""Streaming parser for STL responses."""
+from __future__ import annotations
+
+import codecs
+import json
+
+from .models import STLZone
+
+DOOR_ZONE_TYPES = ("PERIMETER", "DELAY_1")
+DOOR_SUBTYPES = ("MC303_VANISH",)
+
+_WHITESPACE = " \t\n\r"
+_SEPARATORS = _WHITESPACE + ","
+
+
+class STLDeviceParser:
+    """Incrementally parse a /devices body into door sensor zones.
+
+    The body is fed in chunks as it arrives, every device of the top level
+    array is decoded on its own and reduced to the few fields used, so
+    neither the whole body nor the whole device list is held in memory.
+    """
+
+    def __init__(self) -> None:
+        """Initialize parser."""
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._started = False
+        self._finished = False
+        self.zones: dict[str, STLZone] = {}
+
+    def feed(self, chunk: bytes) -> None:
+        """Parse the devices completed by a chunk of the body."""
+        self._buffer += self._utf8.decode(chunk)
+        self._parse()
+
+    def close(self) -> dict[str, STLZone]:
+        """Finish parsing and return zones."""
+        self._buffer += self._utf8.decode(b"", final=True)
+        self._parse()
+        if not self._finished or self._buffer.strip(_WHITESPACE):
+            raise ValueError("Incomplete or malformed devices response")
+        return self.zones
+
+    def _parse(self) -> None:
+        """Parse complete devices in the buffer."""
+        buffer = self._buffer
+        end = len(buffer)
+        pos = 0
+        if not self._started:
+            while pos < end and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos == end:
+                return
+            if buffer[pos] != "[":
+                raise ValueError("Devices response is not a list")
+            self._started = True
+            pos += 1
+
+        while not self._finished:
+            while pos < end and buffer[pos] in _SEPARATORS:
+                pos += 1
+            if pos == end:
+                break
+            if buffer[pos] == "]":
+                self._finished = True
+                pos += 1
+                break
+            try:
+                device, pos = self._decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Device continues in the next chunk
+                break
+            self._add_device(device)
+
+        self._buffer = buffer[pos:]
+
+    def _add_device(self, device: dict) -> None:
+        """Keep door sensors."""
+        if (
+            device["zone_type"] in DOOR_ZONE_TYPES
+            and device["subtype"] in DOOR_SUBTYPES
+        ):
+            is_open = any(
+                warning["type"] == "OPENED" for warning in device["warnings"] or ()
+            )
+            self.zones[device["id"]] = STLZone(
+                device["id"], device["traits"]["location"]["name"], is_open
+            )
@@ -0,0 +1,142 @@
+"""Update cycle profiler for STL integration."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterator
+from contextlib import contextmanager
+import cProfile
+import io
+import pstats
+from time import perf_counter
+import tracemalloc
+
+from .const import PROFILE_MEMORY_TOP, PROFILE_STATS_TOP
+
+
+class STLProfiler:
+    """Profile a number of update cycles of a coordinator.
+
+    Each cycle runs under cProfile, with its fetch and listener phases
+    timed and a tracemalloc snapshot diff taken across it. The profiler is
+    enabled for the whole cycle, so work of other tasks running on the
+    event loop in the meantime, including waiting in the selector for the
+    network, is part of the statistics. Refreshes overlapping a profiled
+    cycle are not profiled as cycles of their own, their work is part of
+    the statistics of the cycle.
+    """
+
+    def __init__(self, name: str, cycles: int) -> None:
+        """Initialize profiler."""
+        self.name = name
+        self.cycles = cycles
+        self._profile = cProfile.Profile()
+        self._timings: list[dict[str, float]] = []
+        self._memory: list[list[str]] = []
+        self._cycle: dict[str, float] | None = None
+        self._snapshot: tracemalloc.Snapshot | None = None
+        self._started_tracing = False
+        self._finished = asyncio.Event()
+
+    @property
+    def profiled(self) -> int:
+        """Return number of cycles profiled."""
+        return len(self._timings)
+
+    @property
+    def active(self) -> bool:
+        """Return if a cycle is being profiled."""
+        return self._cycle is not None
+
+    @property
+    def done(self) -> bool:
+        """Return if all cycles have been profiled."""
+        return self.profiled >= self.cycles
+
+    def begin_cycle(self) -> None:
+        """Start profiling a cycle."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._snapshot = tracemalloc.take_snapshot()
+        self._cycle = {"start": perf_counter()}
+        self._profile.enable()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a phase of the current cycle."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            if self._cycle is not None:
+                self._cycle[name] = self._cycle.get(name, 0.0) + perf_counter() - start
+
+    def end_cycle(self) -> None:
+        """Stop profiling a cycle, unless profiling was cancelled."""
+        if self._cycle is None:
+            return
+        self._profile.disable()
+        cycle, self._cycle = self._cycle, None
+        cycle["total"] = perf_counter() - cycle.pop("start")
+        self._timings.append(cycle)
+        snapshot = tracemalloc.take_snapshot()
+        self._memory.append(
+            [
+                str(stat)
+                for stat in snapshot.compare_to(self._snapshot, "lineno")[
+                    :PROFILE_MEMORY_TOP
+                ]
+            ]
+        )
+        self._snapshot = None
+        if self.done:
+            self._finish()
+
+    def cancel(self) -> None:
+        """Stop profiling, keeping the cycles profiled so far."""
+        if self._cycle is not None:
+            self._profile.disable()
+            self._cycle = None
+            self._snapshot = None
+        self._finish()
+
+    def _finish(self) -> None:
+        """Stop tracing memory and wake up waiters."""
+        if self._finished.is_set():
+            return
+        if self._started_tracing:
+            tracemalloc.stop()
+        self._finished.set()
+
+    async def async_wait(self) -> None:
+        """Wait until all cycles have been profiled or profiling is cancelled."""
+        await self._finished.wait()
+
+    def write(self, path: str) -> None:
+        """Write a text report and the raw statistics next to it."""
+        self._profile.dump_stats(f"{path}.prof")
+        with open(f"{path}.txt", "w", encoding="utf-8") as file:
+            file.write(self.report())
+
+    def report(self) -> str:
+        """Return a text report of the profiled cycles."""
+        out = io.StringIO()
+        out.write(f"Profile of {len(self._timings)} update cycles of {self.name}\n\n")
+        out.write("Cycle timings (seconds)\n")
+        for number, cycle in enumerate(self._timings, 1):
+            phases = ", ".join(f"{name} {value:.4f}" for name, value in cycle.items())
+            out.write(f"  {number}: {phases}\n")
+
+        out.write("\nFunctions by cumulative time\n")
+        stats = pstats.Stats(self._profile, stream=out)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_STATS_TOP)
+
+        out.write("Functions by own time\n")
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(PROFILE_STATS_TOP)
+
+        out.write("Memory allocated during each cycle, by line\n")
+        for number, lines in enumerate(self._memory, 1):
+            out.write(f"  {number}:\n")
+            for line in lines:
+                out.write(f"    {line}\n")
+        return out.getvalue()
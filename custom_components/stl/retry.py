@@ -0,0 +1,105 @@
+"""Retry policy and circuit breaker for STL integration."""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import logging
+import random
+from time import monotonic
+
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from .const import (
+    BACKOFF_BASE,
+    BACKOFF_MAX,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def backoff_delay(attempt: int, retry_after: str | None = None) -> float:
+    """Return delay before the next attempt.
+
+    Exponential backoff with full jitter, unless the server asked for a
+    specific delay with Retry-After.
+    """
+    if retry_after is not None and (delay := parse_retry_after(retry_after)):
+        return min(delay, BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+
+def parse_retry_after(value: str) -> float | None:
+    """Return seconds from a Retry-After header in seconds or HTTP date."""
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class STLCircuitBreaker:
+    """Stop outbound requests while the cloud is failing.
+
+    After a number of consecutive failures the circuit opens and requests
+    fail immediately. Once the reset timeout has passed a single probe
+    request is let through, its outcome closes or reopens the circuit.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+        probe_timeout: float = 30,
+    ) -> None:
+        """Initialize circuit breaker."""
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._probe_timeout = probe_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probe_until = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        """Return if requests are being stopped."""
+        return self._opened_at is not None
+
+    def before_request(self) -> None:
+        """Raise if a request may not be sent now."""
+        if self._opened_at is None:
+            return
+        now = monotonic()
+        if now - self._opened_at < self._reset_timeout or now < self._probe_until:
+            raise UpdateFailed("STL cloud is unavailable, not sending requests")
+        # Let a single probe through, others wait for its outcome
+        self._probe_until = now + self._probe_timeout
+
+    def record_success(self) -> None:
+        """Record a request reaching the cloud."""
+        if self._opened_at is not None:
+            _LOGGER.info("STL cloud recovered")
+        self._failures = 0
+        self._opened_at = None
+        self._probe_until = 0.0
+
+    def record_failure(self) -> None:
+        """Record a failed request."""
+        self._failures += 1
+        if self._opened_at is not None:
+            self._opened_at = monotonic()
+            self._probe_until = 0.0
+        elif self._failures >= self._failure_threshold:
+            _LOGGER.warning(
+                "STL cloud failed %s times in a row, pausing requests for %s s",
+                self._failures,
+                self._reset_timeout,
+            )
+            self._opened_at = monotonic()
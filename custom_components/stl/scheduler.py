@@ -0,0 +1,59 @@
+"""Polling scheduler for STL integration."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from time import monotonic
+
+from .const import POLL_TOLERANCE
+
+
+class STLPollScheduler:
+    """Keep track of when each endpoint is due to be polled.
+
+    Polls can be moved in time by an align callback, given the time of the
+    poll and the interval of the endpoint.
+    """
+
+    def __init__(
+        self,
+        intervals: dict[str, float],
+        align: Callable[[float, float], float] | None = None,
+    ) -> None:
+        """Initialize scheduler, every endpoint is due at start."""
+        self._intervals = dict(intervals)
+        self._next_poll = dict.fromkeys(intervals, 0.0)
+        self._align = align
+
+    def due(self, now: float | None = None) -> set[str]:
+        """Return endpoints due for polling, or about to be."""
+        now = (monotonic() if now is None else now) + POLL_TOLERANCE
+        return {url for url, when in self._next_poll.items() if when <= now}
+
+    def mark_polled(self, url: str, now: float | None = None) -> None:
+        """Schedule next poll of an endpoint one interval from now."""
+        now = monotonic() if now is None else now
+        self._next_poll[url] = self._next(now, self._intervals[url])
+
+    def request(self, url: str) -> None:
+        """Poll an endpoint on the next cycle."""
+        self._next_poll[url] = 0.0
+
+    def set_interval(self, url: str, interval: float) -> None:
+        """Change polling interval, rescheduling a pending poll if sooner."""
+        previous = self._intervals[url]
+        self._intervals[url] = interval
+        if self._next_poll[url] - previous + interval < self._next_poll[url]:
+            self._next_poll[url] = self._next(
+                self._next_poll[url] - previous, interval
+            )
+
+    def next_poll_in(self, now: float | None = None) -> float:
+        """Return seconds until the next endpoint is due."""
+        now = monotonic() if now is None else now
+        return max(0.0, min(self._next_poll.values()) - now)
+
+    def _next(self, polled: float, interval: float) -> float:
+        """Return time of the poll one interval after another."""
+        if self._align is None:
+            return polled + interval
+        return self._align(polled + interval, interval)
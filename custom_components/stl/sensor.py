@@ -0,0 +1,265 @@
+"""Adds sensors for STL integration."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+import logging
+
+from homeassistant.components.sensor import (
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import TIME_SECONDS
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity import DeviceInfo, EntityCategory
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.typing import StateType
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .__init__ import STLAlarmHub
+from .const import CONF_PANEL, DOMAIN
+from .coordinator import PANEL_CONTEXT, STLDataUpdateCoordinator
+from .models import STLPanelIssue, STLPanelSnapshot
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class STLSensorEntityDescriptionMixin:
+    """Mixin for required keys."""
+
+    value_fn: Callable[[STLAlarmHub], StateType]
+
+
+@dataclass
+class STLSensorEntityDescription(
+    SensorEntityDescription, STLSensorEntityDescriptionMixin
+):
+    """Describes STL sensor entity."""
+
+    attributes_fn: Callable[[STLAlarmHub], dict] | None = None
+
+
+@dataclass
+class STLPanelSensorEntityDescriptionMixin:
+    """Mixin for required keys."""
+
+    issues_fn: Callable[[STLPanelSnapshot], tuple[STLPanelIssue, ...]]
+
+
+@dataclass
+class STLPanelSensorEntityDescription(
+    SensorEntityDescription, STLPanelSensorEntityDescriptionMixin
+):
+    """Describes STL panel issue sensor entity."""
+
+
+PANEL_SENSOR_TYPES: tuple[STLPanelSensorEntityDescription, ...] = (
+    STLPanelSensorEntityDescription(
+        key="alarms",
+        name="Alarms",
+        icon="mdi:alarm-light",
+        issues_fn=lambda snapshot: snapshot.alarms,
+    ),
+    STLPanelSensorEntityDescription(
+        key="alerts",
+        name="Alerts",
+        icon="mdi:alert",
+        issues_fn=lambda snapshot: snapshot.alerts,
+    ),
+    STLPanelSensorEntityDescription(
+        key="troubles",
+        name="Troubles",
+        icon="mdi:alert-circle",
+        issues_fn=lambda snapshot: snapshot.troubles,
+    ),
+)
+
+
+def _latency_attributes(hub: STLAlarmHub) -> dict:
+    """Return mean and max latency per endpoint."""
+    return {
+        endpoint: {
+            "mean": round(metrics.latency_mean, 3)
+            if metrics.latency_mean is not None
+            else None,
+            "max": round(metrics.latency_max, 3),
+        }
+        for endpoint, metrics in hub.metrics.endpoints.items()
+    }
+
+
+def _request_attributes(hub: STLAlarmHub) -> dict:
+    """Return number of requests per endpoint."""
+    return {
+        endpoint: metrics.requests
+        for endpoint, metrics in hub.metrics.endpoints.items()
+    }
+
+
+SENSOR_TYPES: tuple[STLSensorEntityDescription, ...] = (
+    STLSensorEntityDescription(
+        key="requests",
+        name="Requests",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda hub: hub.metrics.total("requests"),
+        attributes_fn=_request_attributes,
+    ),
+    STLSensorEntityDescription(
+        key="retries",
+        name="Request retries",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda hub: hub.metrics.total("retries"),
+    ),
+    STLSensorEntityDescription(
+        key="client_errors",
+        name="Client errors",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda hub: hub.metrics.total("client_errors"),
+    ),
+    STLSensorEntityDescription(
+        key="server_errors",
+        name="Server errors",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda hub: hub.metrics.total("server_errors"),
+    ),
+    STLSensorEntityDescription(
+        key="timeouts",
+        name="Request timeouts",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda hub: hub.metrics.total("timeouts"),
+    ),
+    STLSensorEntityDescription(
+        key="logins",
+        name="Logins",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda hub: hub.logins,
+    ),
+    STLSensorEntityDescription(
+        key="latency",
+        name="Request latency",
+        native_unit_of_measurement=TIME_SECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda hub: round(hub.metrics.latency_mean, 3)
+        if hub.metrics.latency_mean is not None
+        else None,
+        attributes_fn=_latency_attributes,
+    ),
+    STLSensorEntityDescription(
+        key="cycle_duration",
+        name="Update cycle duration",
+        native_unit_of_measurement=TIME_SECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda hub: round(hub.metrics.last_cycle_duration, 3)
+        if hub.metrics.last_cycle_duration is not None
+        else None,
+    ),
+    STLSensorEntityDescription(
+        key="cycles_over_deadline",
+        name="Update cycles over deadline",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda hub: hub.metrics.cycles_over_deadline,
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
+) -> None:
+    """Set entry for panel and diagnostic sensors."""
+
+    stl_hub: STLAlarmHub = hass.data[DOMAIN][entry.entry_id]["api"]
+    coordinator: STLDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id][
+        "coordinator"
+    ]
+    panel_id: str = entry.data[CONF_PANEL]
+    entities: list[SensorEntity] = [
+        STLPanelSensor(coordinator, panel_id, description)
+        for description in PANEL_SENSOR_TYPES
+    ]
+    entities.extend(
+        STLDiagnosticSensor(stl_hub, coordinator, panel_id, description)
+        for description in SENSOR_TYPES
+    )
+    async_add_entities(entities)
+
+
+class STLPanelSensor(CoordinatorEntity, SensorEntity):
+    """Number of alarms, alerts or troubles reported by the panel."""
+
+    entity_description: STLPanelSensorEntityDescription
+
+    def __init__(
+        self,
+        coordinator: STLDataUpdateCoordinator,
+        panel_id: str,
+        description: STLPanelSensorEntityDescription,
+    ) -> None:
+        """Initizialize STL panel sensor."""
+        super().__init__(coordinator, PANEL_CONTEXT)
+        self.entity_description = description
+        self._attr_name = f"Alarm Panel {panel_id} {description.name}"
+        self._attr_unique_id = f"stl_{description.key}_{panel_id}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, f"stl_panel_{panel_id}")}
+        )
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the state."""
+        return len(self.entity_description.issues_fn(self.coordinator.data))
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        """Return the reported issues."""
+        return {
+            self.entity_description.key: [
+                issue._asdict()
+                for issue in self.entity_description.issues_fn(self.coordinator.data)
+            ],
+            **self.coordinator.stale_attributes,
+        }
+
+
+class STLDiagnosticSensor(CoordinatorEntity, SensorEntity):
+    """STL request metrics sensor."""
+
+    entity_description: STLSensorEntityDescription
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(
+        self,
+        hub: STLAlarmHub,
+        coordinator: STLDataUpdateCoordinator,
+        panel_id: str,
+        description: STLSensorEntityDescription,
+    ) -> None:
+        """Initizialize STL diagnostic sensor."""
+        self._hub = hub
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._attr_name = f"Alarm Panel {panel_id} {description.name}"
+        self._attr_unique_id = f"stl_{description.key}_{panel_id}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, f"stl_panel_{panel_id}")}
+        )
+
+    @property
+    def available(self) -> bool:
+        """Return if entity is available, metrics also count failed updates."""
+        return True
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the state."""
+        return self.entity_description.value_fn(self._hub)
+
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        """Return additional information."""
+        if self.entity_description.attributes_fn is None:
+            return None
+        return self.entity_description.attributes_fn(self._hub)
@@ -0,0 +1,144 @@
+"""Services for STL integration."""
+from __future__ import annotations
+
+import logging
+
+import voluptuous as vol
+
+from homeassistant.components import persistent_notification
+from homeassistant.core import HomeAssistant, ServiceCall, callback
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    ATTR_CYCLES,
+    ATTR_END,
+    ATTR_EVENTS,
+    ATTR_LABEL,
+    ATTR_LIMIT,
+    ATTR_NAME,
+    ATTR_START,
+    CONF_PANEL,
+    DOMAIN,
+    EVENT_HISTORY,
+    SERVICE_HISTORY,
+    SERVICE_PROFILE,
+)
+from .coordinator import STLDataUpdateCoordinator
+from .history import async_get_history
+from .profiler import STLProfiler
+
+_LOGGER = logging.getLogger(__name__)
+
+HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_PANEL): cv.string,
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_LABEL): cv.string,
+        vol.Optional(ATTR_NAME): cv.string,
+        vol.Optional(ATTR_LIMIT, default=100): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=10000)
+        ),
+    }
+)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_PANEL): cv.string,
+        vol.Optional(ATTR_CYCLES, default=5): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=100)
+        ),
+    }
+)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register services if not registered yet."""
+    if hass.services.has_service(DOMAIN, SERVICE_HISTORY):
+        return
+
+    async def async_history(call: ServiceCall) -> None:
+        """Fire an event with stored events matching the call."""
+        events = await async_get_history(hass).async_query(
+            call.data.get(CONF_PANEL),
+            call.data.get(ATTR_START),
+            call.data.get(ATTR_END),
+            call.data.get(ATTR_LABEL),
+            call.data.get(ATTR_NAME),
+            call.data[ATTR_LIMIT],
+        )
+        hass.bus.async_fire(
+            EVENT_HISTORY, {**call.data, ATTR_EVENTS: events}, context=call.context
+        )
+
+    async def async_profile(call: ServiceCall) -> None:
+        """Profile the next update cycles of a panel and write a report."""
+        panel_id = call.data[CONF_PANEL]
+        coordinators = _async_get_coordinators(hass)
+        if (coordinator := coordinators.get(panel_id)) is None:
+            raise HomeAssistantError(f"Panel {panel_id} is not loaded")
+        # Only one cProfile profiler can be active at a time
+        if any(other.profiler is not None for other in coordinators.values()):
+            raise HomeAssistantError("A panel is already being profiled")
+        profiler = coordinator.profiler = STLProfiler(
+            f"panel {panel_id}", call.data[ATTR_CYCLES]
+        )
+        path = hass.config.path(
+            f"stl_profile_{panel_id}_{dt_util.now():%Y%m%d_%H%M%S}"
+        )
+
+        async def _async_write_report() -> None:
+            """Write report once all cycles have been profiled."""
+            await profiler.async_wait()
+            if not profiler.profiled:
+                _LOGGER.info("Profiling of panel %s cancelled", panel_id)
+                return
+            await hass.async_add_executor_job(profiler.write, path)
+            _LOGGER.info("Wrote profile of panel %s to %s.txt", panel_id, path)
+            persistent_notification.async_create(
+                hass,
+                f"Profile of {profiler.profiled} update cycles written to "
+                f"`{path}.txt`, statistics for pstats to `{path}.prof`.",
+                title=f"Panel {panel_id} profiled",
+            )
+
+        @callback
+        def _async_cancel() -> None:
+            """Stop profiling when the panel is unloaded."""
+            if coordinator.profiler is profiler:
+                coordinator.profiler = None
+            profiler.cancel()
+
+        if coordinator.config_entry is not None:
+            coordinator.config_entry.async_on_unload(_async_cancel)
+        hass.async_create_task(_async_write_report())
+        await coordinator.async_request_refresh()
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_HISTORY, async_history, schema=HISTORY_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, async_profile, schema=PROFILE_SCHEMA
+    )
+
+
+@callback
+def async_unload_services(hass: HomeAssistant) -> None:
+    """Remove services."""
+    hass.services.async_remove(DOMAIN, SERVICE_HISTORY)
+    hass.services.async_remove(DOMAIN, SERVICE_PROFILE)
+
+
+@callback
+def _async_get_coordinators(
+    hass: HomeAssistant,
+) -> dict[str, STLDataUpdateCoordinator]:
+    """Return coordinators of loaded panels by panel id."""
+    return {
+        entry.data[CONF_PANEL]: hass.data[DOMAIN][entry.entry_id]["coordinator"]
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if entry.entry_id in hass.data[DOMAIN]
+    }
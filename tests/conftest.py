@@ -0,0 +1,173 @@
+"""Fixtures for STL integration tests."""
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant
+import pytest
+import pytest_asyncio
+
+from custom_components.stl import STLAlarmHub
+from custom_components.stl.auth import STLAccount
+from custom_components.stl.const import API_URL
+
+PANEL_ID = "123456"
+
+
+class FakeResponse:
+    """Response of the fake session."""
+
+    def __init__(self, status: int, body: Any, headers: dict | None = None) -> None:
+        """Initialize response."""
+        self.status = status
+        self.headers = headers or {}
+        self._body = json.dumps(body).encode()
+        self.content_length = len(self._body)
+        self.content = self
+        self.released = False
+
+    async def json(self) -> Any:
+        """Return decoded body."""
+        return json.loads(self._body)
+
+    async def read(self) -> bytes:
+        """Return body."""
+        return self._body
+
+    async def iter_chunked(self, size: int):
+        """Yield body in chunks."""
+        for start in range(0, len(self._body), size):
+            yield self._body[start : start + size]
+
+    def release(self) -> None:
+        """Release connection."""
+        self.released = True
+
+
+class FakeSession:
+    """Client session answering requests to the cloud API from memory.
+
+    Endpoints listed in ``fail`` return a server error and requests to
+    endpoints in ``delay`` wait that many seconds first.
+    """
+
+    def __init__(self) -> None:
+        """Initialize session with a disarmed panel and an open door."""
+        self.calls: list[tuple[str, str]] = []
+        self.responses: list[FakeResponse] = []
+        self.posted: list[Any] = []
+        self.fail: set[str] = set()
+        self.delay: dict[str, float] = {}
+        self.bodies: dict[str, Any] = {
+            "/auth": {"user_token": "user"},
+            "/panel/login": {"session_token": "session"},
+            "/panel_info": {"model": "PowerMaster", "serial": PANEL_ID},
+            "/status": {
+                "connected": True,
+                "partitions": [
+                    {"id": -1, "state": "DISARM", "status": "", "ready": True}
+                ],
+            },
+            "/devices": [
+                {
+                    "id": "door",
+                    "zone_type": "PERIMETER",
+                    "subtype": "MC303_VANISH",
+                    "traits": {"location": {"name": "Front door"}},
+                    "warnings": [{"type": "OPENED"}],
+                }
+            ],
+            "/events": [],
+            "/set_state": {"process_token": "process"},
+            "/process_status": [{"token": "process", "status": "succeeded"}],
+        }
+
+    def count(self, endpoint: str) -> int:
+        """Return number of requests to an endpoint."""
+        return sum(1 for _, called in self.calls if called == endpoint)
+
+    async def _request(self, method: str, url: str) -> FakeResponse:
+        """Answer a request."""
+        endpoint = url[len(API_URL) :].split("?")[0]
+        self.calls.append((method, endpoint))
+        await asyncio.sleep(self.delay.get(endpoint, 0))
+        if endpoint in self.fail:
+            response = FakeResponse(500, {})
+        else:
+            response = FakeResponse(200, self.bodies.get(endpoint, []))
+        self.responses.append(response)
+        return response
+
+    async def get(self, url: str, **kwargs: Any) -> FakeResponse:
+        """Send GET request."""
+        return await self._request("GET", url)
+
+    async def post(self, url: str, **kwargs: Any) -> FakeResponse:
+        """Send POST request."""
+        self.posted.append(kwargs.get("json"))
+        return await self._request("POST", url)
+
+
+class FakeStore:
+    """Storage kept in memory."""
+
+    def __init__(self) -> None:
+        """Initialize store."""
+        self.data: dict | None = None
+
+    async def async_load(self) -> dict | None:
+        """Return stored data."""
+        return self.data
+
+    def async_delay_save(self, data_func, delay: float = 0) -> None:
+        """Store data straight away."""
+        self.data = data_func()
+
+    async def async_save(self, data: dict) -> None:
+        """Store data."""
+        self.data = data
+
+    async def async_remove(self) -> None:
+        """Remove data."""
+        self.data = None
+
+
+@pytest.fixture(autouse=True)
+def no_backoff():
+    """Retry failed requests without waiting."""
+    with patch("custom_components.stl.retry.random.uniform", return_value=0):
+        yield
+
+
+@pytest_asyncio.fixture
+async def hass(tmp_path):
+    """Return Home Assistant instance, not started."""
+    hass = HomeAssistant()
+    hass.config.config_dir = str(tmp_path)
+    yield hass
+    await hass.async_stop(force=True)
+
+
+@pytest.fixture
+def session() -> FakeSession:
+    """Return fake client session."""
+    return FakeSession()
+
+
+@pytest.fixture
+def account(session: FakeSession) -> STLAccount:
+    """Return account using the fake session."""
+    return STLAccount(FakeStore(), "user@example.com", "secret", "app", session)
+
+
+@pytest_asyncio.fixture
+async def hub(session: FakeSession, account: STLAccount):
+    """Return hub of a panel using the fake session."""
+    hub = STLAlarmHub(
+        "user@example.com", "secret", "app", "1234", PANEL_ID, session, account
+    )
+    yield hub
+    hub.async_shutdown()
@@ -0,0 +1,139 @@
+"""Tests for the command queue."""
+from __future__ import annotations
+
+import asyncio
+
+from homeassistant.const import STATE_ALARM_ARMED_AWAY, STATE_ALARM_DISARMED
+import pytest
+
+from custom_components.stl.commands import STLCommandQueue
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakePanel:
+    """Panel taking commands one step of the event loop at a time."""
+
+    def __init__(self) -> None:
+        """Initialize disarmed panel."""
+        self.states: dict[int, tuple[str, float]] = {}
+        self.sent: list[tuple[str, int]] = []
+        self.running = 0
+        self.release = asyncio.Event()
+        self.release.set()
+        self.rejected: set[tuple[str, int]] = set()
+
+    def state(self, partition: int, since: float) -> str | None:
+        """Return state of a partition if known since shortly before a time."""
+        state, known_at = self.states.get(partition, (STATE_ALARM_DISARMED, 0.0))
+        return state if known_at >= since - 1 else None
+
+    async def send(self, command: str, partition: int) -> bool:
+        """Handle a command."""
+        self.running += 1
+        assert self.running == 1, "commands overlap"
+        self.sent.append((command, partition))
+        await self.release.wait()
+        self.running -= 1
+        if (command, partition) in self.rejected:
+            raise RuntimeError("Command rejected")
+        self.states[partition] = (
+            {"full": STATE_ALARM_ARMED_AWAY, "disarm": STATE_ALARM_DISARMED}[command],
+            asyncio.get_running_loop().time(),
+        )
+        return True
+
+
+@pytest.fixture
+def panel() -> FakePanel:
+    """Return fake panel."""
+    return FakePanel()
+
+
+@pytest.fixture
+def queue(panel: FakePanel) -> STLCommandQueue:
+    """Return queue sending to the fake panel."""
+    return STLCommandQueue(panel.send, panel.state)
+
+
+async def test_commands_run_in_order(panel: FakePanel, queue: STLCommandQueue) -> None:
+    """Test commands are sent one at a time in the order submitted."""
+    results = await asyncio.gather(
+        queue.submit("full", 1), queue.submit("full", 2), queue.submit("disarm", 1)
+    )
+    assert results == [True, True, True]
+    assert panel.sent == [("full", 1), ("full", 2), ("disarm", 1)]
+
+
+async def test_identical_commands_merged(
+    panel: FakePanel, queue: STLCommandQueue
+) -> None:
+    """Test a command repeated while queued is sent once."""
+    panel.release.clear()
+    first = asyncio.create_task(queue.submit("full"))
+    await asyncio.sleep(0)
+    # Running commands are only merged with when nothing is queued
+    second = asyncio.create_task(queue.submit("full"))
+    third = asyncio.create_task(queue.submit("disarm"))
+    fourth = asyncio.create_task(queue.submit("disarm"))
+    await asyncio.sleep(0)
+    panel.release.set()
+    assert await asyncio.gather(first, second, third, fourth) == [True] * 4
+    assert panel.sent == [("full", -1), ("disarm", -1)]
+
+
+async def test_command_for_current_state_dropped(
+    panel: FakePanel, queue: STLCommandQueue
+) -> None:
+    """Test arming a partition known to be armed since it was queued."""
+    await queue.submit("full", 1)
+    assert await queue.submit("full", 1)
+    assert panel.sent == [("full", 1)]
+
+
+async def test_command_for_stale_state_sent(
+    panel: FakePanel, queue: STLCommandQueue
+) -> None:
+    """Test a state known before a command was queued does not drop it."""
+    panel.states[1] = (STATE_ALARM_ARMED_AWAY, -1.0)
+    assert await queue.submit("full", 1)
+    assert panel.sent == [("full", 1)]
+
+
+async def test_disarm_always_sent(panel: FakePanel, queue: STLCommandQueue) -> None:
+    """Test disarming is sent even when the partition is known disarmed."""
+    await queue.submit("disarm", 1)
+    assert await queue.submit("disarm", 1)
+    assert panel.sent == [("disarm", 1), ("disarm", 1)]
+
+
+async def test_failed_command_does_not_stop_queue(
+    panel: FakePanel, queue: STLCommandQueue
+) -> None:
+    """Test an error reaches its caller and later commands still run."""
+    panel.release.clear()
+    panel.rejected.add(("full", -1))
+    failing = asyncio.create_task(queue.submit("full"))
+    await asyncio.sleep(0)
+    following = asyncio.create_task(queue.submit("full", 1))
+    await asyncio.sleep(0)
+    panel.release.set()
+    with pytest.raises(RuntimeError):
+        await failing
+    assert await following
+    assert panel.sent == [("full", -1), ("full", 1)]
+
+
+async def test_cancelled_caller_keeps_command(
+    panel: FakePanel, queue: STLCommandQueue
+) -> None:
+    """Test a caller giving up does not cancel a merged command."""
+    panel.release.clear()
+    impatient = asyncio.create_task(queue.submit("full"))
+    await asyncio.sleep(0)
+    patient = asyncio.create_task(queue.submit("full"))
+    await asyncio.sleep(0)
+    impatient.cancel()
+    panel.release.set()
+    assert await patient
+    assert panel.sent == [("full", -1)]
@@ -0,0 +1,147 @@
+"""Tests for the STL data update coordinator."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+import logging
+from types import MappingProxyType
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.update_coordinator import UpdateFailed
+import pytest
+
+from custom_components.stl.coordinator import (
+    PANEL_CONTEXT,
+    STLDataUpdateCoordinator,
+    changed_contexts,
+)
+from custom_components.stl.models import STLPanelSnapshot, STLZone
+
+_LOGGER = logging.getLogger(__name__)
+
+pytestmark = pytest.mark.asyncio
+
+SNAPSHOT = STLPanelSnapshot(
+    state="DISARM",
+    is_online=True,
+    zones=MappingProxyType(
+        {
+            "door": STLZone("door", "Front door", False),
+            "window": STLZone("window", "Window", False),
+        }
+    ),
+)
+
+
+def with_zone(snapshot: STLPanelSnapshot, zone: STLZone) -> STLPanelSnapshot:
+    """Return snapshot with a zone replaced."""
+    return snapshot._replace(
+        zones=MappingProxyType({**snapshot.zones, zone.id: zone})
+    )
+
+
+async def test_changed_contexts() -> None:
+    """Test only the panel and zones that differ are reported."""
+    assert changed_contexts(SNAPSHOT, SNAPSHOT) == set()
+    # Zones fetched again are compared one by one
+    assert not changed_contexts(
+        SNAPSHOT, SNAPSHOT._replace(zones=MappingProxyType(dict(SNAPSHOT.zones)))
+    )
+    opened = with_zone(SNAPSHOT, STLZone("door", "Front door", True))
+    assert changed_contexts(SNAPSHOT, opened) == {"door"}
+    assert changed_contexts(SNAPSHOT, opened._replace(state="AWAY")) == {
+        PANEL_CONTEXT,
+        "door",
+    }
+    removed = SNAPSHOT._replace(
+        zones=MappingProxyType({"door": SNAPSHOT.zones["door"]})
+    )
+    assert changed_contexts(SNAPSHOT, removed) == {"window"}
+
+
+async def test_listeners_of_changed_contexts_updated(hass: HomeAssistant) -> None:
+    """Test listeners are only called when their context changed."""
+    coordinator = STLDataUpdateCoordinator(
+        hass, _LOGGER, name="stl_test", update_interval=None
+    )
+    coordinator.async_set_updated_data(SNAPSHOT)
+    calls: list[str | None] = []
+    for context in (PANEL_CONTEXT, "door", "window", None):
+        coordinator.async_add_listener(
+            lambda context=context: calls.append(context), context
+        )
+
+    coordinator.async_set_updated_data(SNAPSHOT)
+    assert calls == [None]
+
+    calls.clear()
+    coordinator.async_set_updated_data(
+        with_zone(SNAPSHOT, STLZone("door", "Front door", True))
+    )
+    assert calls == ["door", None]
+
+    calls.clear()
+    coordinator.async_set_updated_data(coordinator.data._replace(state="AWAY"))
+    assert calls == [PANEL_CONTEXT, None]
+
+
+async def test_stale_data_served_during_grace_period(hass: HomeAssistant) -> None:
+    """Test failed updates keep the last snapshot until the grace period ends."""
+    results: list[STLPanelSnapshot | Exception] = [SNAPSHOT]
+
+    async def update() -> STLPanelSnapshot:
+        if isinstance(result := results[-1], Exception):
+            raise result
+        return result
+
+    coordinator = STLDataUpdateCoordinator(
+        hass,
+        _LOGGER,
+        name="stl_test",
+        update_method=update,
+        update_interval=None,
+        grace_period=timedelta(minutes=5),
+    )
+    calls: list[str] = []
+    coordinator.async_add_listener(lambda: calls.append("door"), "door")
+    now = datetime(2023, 2, 1, 12, tzinfo=timezone.utc)
+    with patch("custom_components.stl.coordinator.dt_util.utcnow") as utcnow:
+        utcnow.return_value = now
+        await coordinator.async_refresh()
+        assert coordinator.stale_attributes == {}
+
+        results.append(UpdateFailed("Could not retrieve status"))
+        await coordinator.async_refresh()
+        assert coordinator.last_update_success
+        assert coordinator.data is SNAPSHOT
+        assert coordinator.stale_attributes == {"Stale since": now.isoformat()}
+        # Every entity shows it is stale, whatever changed
+        assert calls == ["door", "door"]
+
+        utcnow.return_value = now + timedelta(minutes=5)
+        await coordinator.async_refresh()
+        assert not coordinator.last_update_success
+
+        results.append(SNAPSHOT)
+        await coordinator.async_refresh()
+        assert coordinator.last_update_success
+        assert coordinator.stale_since is None
+
+
+async def test_no_grace_without_data(hass: HomeAssistant) -> None:
+    """Test a failing first update is not covered by the grace period."""
+
+    async def update() -> STLPanelSnapshot:
+        raise UpdateFailed("Could not retrieve status")
+
+    coordinator = STLDataUpdateCoordinator(
+        hass,
+        _LOGGER,
+        name="stl_test",
+        update_method=update,
+        update_interval=None,
+        grace_period=timedelta(minutes=5),
+    )
+    await coordinator.async_refresh()
+    assert not coordinator.last_update_success
+    assert coordinator.stale_since is None
@@ -0,0 +1,141 @@
+"""Tests for the fleet scheduler."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from custom_components.stl.const import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_COMMAND,
+    PRIORITY_POLL,
+)
+from custom_components.stl.fleet import STLFleetScheduler
+
+
+async def hold(
+    fleet: STLFleetScheduler,
+    name: str,
+    log: list[str],
+    release: asyncio.Event,
+    priority: int = PRIORITY_POLL,
+) -> None:
+    """Take a request slot, log it and keep it until released."""
+    async with fleet.request_slot(priority):
+        log.append(name)
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_bounded() -> None:
+    """Test no more requests than allowed run at the same time."""
+    fleet = STLFleetScheduler(max_concurrent=2, rate=1000, burst=100)
+    log: list[str] = []
+    release = asyncio.Event()
+    tasks = [
+        asyncio.create_task(hold(fleet, str(number), log, release))
+        for number in range(5)
+    ]
+    await asyncio.sleep(0.01)
+    assert log == ["0", "1"]
+    release.set()
+    await asyncio.gather(*tasks)
+    assert log == ["0", "1", "2", "3", "4"]
+    assert fleet._active == 0
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate() -> None:
+    """Test a burst goes through at once and later requests at the rate."""
+    fleet = STLFleetScheduler(max_concurrent=10, rate=50, burst=2)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    started: list[float] = []
+
+    async def request() -> None:
+        async with fleet.request_slot():
+            started.append(loop.time() - start)
+
+    await asyncio.gather(*(request() for _ in range(5)))
+    assert started[1] < 0.01
+    # Three more tokens at 50 per second
+    assert started[4] >= 0.05
+    assert started == sorted(started)
+
+
+@pytest.mark.asyncio
+async def test_requests_let_through_by_priority() -> None:
+    """Test commands go before polls and polls before background fetches."""
+    fleet = STLFleetScheduler(max_concurrent=1, rate=1000, burst=100)
+    log: list[str] = []
+    busy, release = asyncio.Event(), asyncio.Event()
+    release.set()
+    tasks = [asyncio.create_task(hold(fleet, "busy", log, busy))]
+    await asyncio.sleep(0)
+    for name, priority in (
+        ("background", PRIORITY_BACKGROUND),
+        ("poll 1", PRIORITY_POLL),
+        ("poll 2", PRIORITY_POLL),
+        ("command", PRIORITY_COMMAND),
+    ):
+        tasks.append(asyncio.create_task(hold(fleet, name, log, release, priority)))
+        await asyncio.sleep(0)
+    busy.set()
+    await asyncio.gather(*tasks)
+    assert log == ["busy", "command", "poll 1", "poll 2", "background"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_frees_its_turn() -> None:
+    """Test a request cancelled while waiting does not hold a slot."""
+    fleet = STLFleetScheduler(max_concurrent=1, rate=1000, burst=100)
+    log: list[str] = []
+    busy, release = asyncio.Event(), asyncio.Event()
+    release.set()
+    first = asyncio.create_task(hold(fleet, "first", log, busy))
+    await asyncio.sleep(0)
+    cancelled = asyncio.create_task(hold(fleet, "cancelled", log, release))
+    waiting = asyncio.create_task(hold(fleet, "waiting", log, release))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    busy.set()
+    await asyncio.gather(first, waiting)
+    assert log == ["first", "waiting"]
+    assert fleet._active == 0
+
+
+def test_phases_spread_over_panels() -> None:
+    """Test panels get evenly spread phases, updated on unregistering."""
+    fleet = STLFleetScheduler(8, 5, 20)
+    unregister = fleet.register("a")
+    fleet.register("b")
+    fleet.register("c")
+    assert [fleet.phase(key) for key in "abc"] == [0, 1 / 3, 2 / 3]
+    assert fleet.phase("unknown") == 0
+    unregister()
+    assert [fleet.phase(key) for key in "bc"] == [0, 1 / 2]
+
+
+def test_align_to_phase() -> None:
+    """Test polls move to the nearest point of the panel's grid."""
+    fleet = STLFleetScheduler(8, 5, 20)
+    fleet.register("a")
+    assert fleet.align("a", 1003.7, 30) == 1003.7
+
+    fleet.register("b")
+    assert fleet.align("a", 1003.7, 30) == 990
+    assert fleet.align("b", 1003.7, 30) == 1005
+    for when in (1000.0, 1012.4, 1029.9, 1044.9):
+        aligned = fleet.align("b", when, 30)
+        assert (aligned - 15) % 30 == 0
+        assert abs(aligned - when) <= 15
+
+
+def test_rate_grows_with_panels() -> None:
+    """Test the rate is sized for the panels, at least the minimum."""
+    fleet = STLFleetScheduler(8, 5, 20, 0.5)
+    unregisters = [fleet.register(str(number)) for number in range(50)]
+    assert fleet._rate == 25
+    for unregister in unregisters[5:]:
+        unregister()
+    assert fleet._rate == 5
@@ -0,0 +1,60 @@
+"""Tests for the local event history."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from homeassistant.core import HomeAssistant
+import pytest
+import pytest_asyncio
+
+from custom_components.stl.history import DATETIME_FORMAT, STLEventHistory
+from custom_components.stl.models import STLEvent
+
+pytestmark = pytest.mark.asyncio
+
+# Recent enough not to be pruned
+DAY = datetime.now().replace(microsecond=0) - timedelta(days=1)
+EVENTS = [
+    STLEvent(1, "ARM", "Anna", DAY.replace(hour=8).strftime(DATETIME_FORMAT)),
+    STLEvent(2, "DISARM", "Bertil", DAY.replace(hour=17).strftime(DATETIME_FORMAT)),
+    STLEvent(None, "TAMPER", None, None),
+]
+
+
+@pytest_asyncio.fixture
+async def history(hass: HomeAssistant, tmp_path):
+    """Return history stored in a temporary database."""
+    history = STLEventHistory(hass, str(tmp_path / "history.db"))
+    yield history
+    await history.async_close()
+
+
+async def test_events_stored_once(history: STLEventHistory) -> None:
+    """Test events fetched again are not duplicated, even without id or time."""
+    await history.async_add("1", EVENTS)
+    await history.async_add("1", EVENTS)
+    await history.async_add("2", EVENTS[:1])
+    events = await history.async_query(panel_id="1")
+    assert [event["id"] for event in events] == [2, 1, None]
+    assert len(await history.async_query()) == 4
+
+
+async def test_query_filters(history: STLEventHistory) -> None:
+    """Test events are filtered by time, label and user."""
+    await history.async_add("1", EVENTS)
+    after = await history.async_query(start=DAY.replace(hour=12))
+    assert [event["label"] for event in after] == ["DISARM"]
+    assert [event["id"] for event in await history.async_query(label="ARM")] == [1]
+    assert [event["id"] for event in await history.async_query(name="Bertil")] == [2]
+    assert len(await history.async_query(limit=1)) == 1
+
+
+async def test_last_user_and_removal(history: STLEventHistory) -> None:
+    """Test the last user of labels is found and panels can be removed."""
+    await history.async_add("1", EVENTS)
+    assert await history.async_last_user("1", ("ARM", "DISARM")) == "Bertil"
+    assert await history.async_last_user("1", ("ARM",)) == "Anna"
+    assert await history.async_last_user("2", ("ARM",)) is None
+
+    await history.async_remove_panel("1")
+    assert await history.async_query() == []
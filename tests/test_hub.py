@@ -0,0 +1,276 @@
+"""Tests for fetching and commands of the STL hub."""
+from __future__ import annotations
+
+import asyncio
+import json
+
+from homeassistant.const import (
+    STATE_ALARM_ARMED_AWAY,
+    STATE_ALARM_ARMED_HOME,
+    STATE_ALARM_DISARMED,
+)
+from homeassistant.helpers.update_coordinator import UpdateFailed
+import pytest
+
+from custom_components.stl import STLAlarmHub
+from custom_components.stl.auth import STLAccount
+from custom_components.stl.const import CIRCUIT_FAILURE_THRESHOLD, URL_STATUS
+from custom_components.stl.fleet import STLFleetScheduler
+from custom_components.stl.models import STLPanelSnapshot, STLPartition, STLZone
+
+from .conftest import PANEL_ID, FakeSession, FakeStore
+
+pytestmark = pytest.mark.asyncio
+
+
+def stored_hub(session: FakeSession, account: STLAccount) -> STLAlarmHub:
+    """Return hub persisting its state in memory."""
+    return STLAlarmHub(
+        "user@example.com",
+        "secret",
+        "app",
+        "1234",
+        PANEL_ID,
+        session,
+        account,
+        FakeStore(),
+    )
+
+
+def poll_everything(hub: STLAlarmHub) -> None:
+    """Make every polled endpoint due."""
+    for url in list(hub._scheduler._next_poll):
+        hub._scheduler.request(url)
+
+
+async def test_fetch_snapshot(hub: STLAlarmHub, session: FakeSession) -> None:
+    """Test a first fetch logs in and builds the snapshot."""
+    snapshot = await hub.fetch_info()
+    assert snapshot.alarm_state == STATE_ALARM_DISARMED
+    assert snapshot.is_online
+    assert dict(snapshot.zones) == {"door": STLZone("door", "Front door", True)}
+    assert session.count("/auth") == session.count("/panel/login") == 1
+
+
+async def test_concurrent_fetches_share_one(
+    hub: STLAlarmHub, session: FakeSession
+) -> None:
+    """Test callers fetching at the same time join a single fetch."""
+    session.delay["/status"] = 0.02
+    snapshots = await asyncio.gather(*(hub.fetch_info() for _ in range(3)))
+    assert snapshots[0] is snapshots[1] is snapshots[2]
+    assert session.count("/status") == 1
+
+
+async def test_fetch_follows_request_during_fetch(
+    hub: STLAlarmHub, session: FakeSession
+) -> None:
+    """Test status requested during a fetch is fetched once it finishes."""
+    session.delay["/status"] = 0.02
+    first = asyncio.create_task(hub.fetch_info())
+    await asyncio.sleep(0.01)
+    hub._scheduler.request(URL_STATUS)
+    await hub.fetch_info()
+    assert first.done()
+    assert session.count("/status") == 2
+
+
+async def test_fetch_not_due_sends_nothing(
+    hub: STLAlarmHub, session: FakeSession
+) -> None:
+    """Test fetching again before anything is due reuses the snapshot."""
+    snapshot = await hub.fetch_info()
+    calls = len(session.calls)
+    assert await hub.fetch_info() is snapshot
+    assert len(session.calls) == calls
+
+
+async def test_failing_logins_open_circuit(
+    hub: STLAlarmHub, session: FakeSession, account: STLAccount
+) -> None:
+    """Test logins stop once the circuit opens."""
+    session.fail.add("/auth")
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD + 3):
+        poll_everything(hub)
+        with pytest.raises(UpdateFailed):
+            await hub.fetch_info()
+    assert account.breaker.is_open
+    assert session.count("/auth") == CIRCUIT_FAILURE_THRESHOLD
+
+
+async def test_status_failure_keeps_other_parts(
+    hub: STLAlarmHub, session: FakeSession
+) -> None:
+    """Test parts fetched in a cycle failing on status are kept."""
+    await hub.fetch_info()
+    session.fail.add("/status")
+    session.bodies["/devices"][0]["warnings"] = None
+    poll_everything(hub)
+    with pytest.raises(UpdateFailed):
+        await hub.fetch_info()
+
+    session.fail.clear()
+    devices = session.count("/devices")
+    hub._scheduler.request(URL_STATUS)
+    snapshot = await hub.fetch_info()
+    assert session.count("/devices") == devices
+    assert not snapshot.zones["door"].is_open
+
+
+async def test_command_requests_status(hub: STLAlarmHub, session: FakeSession) -> None:
+    """Test a handled command is pending until status is fetched again."""
+    await hub.fetch_info()
+    assert await hub.triggeralarm("full", "1234")
+    assert hub.command_pending(-1)
+    assert ("POST", "/set_state") in session.calls
+
+    session.bodies["/status"]["partitions"][0]["state"] = "AWAY"
+    snapshot = await hub.fetch_info()
+    assert snapshot.alarm_state == STATE_ALARM_ARMED_AWAY
+    assert not hub.command_pending(-1)
+
+
+async def test_disarm_sent_after_keypad_arming(
+    hub: STLAlarmHub, session: FakeSession
+) -> None:
+    """Test a disarm is sent though the last status fetched was disarmed."""
+    await hub.fetch_info()
+    session.bodies["/status"]["partitions"][0]["state"] = "AWAY"
+    assert await hub.triggeralarm("disarm", "1234")
+    assert ("POST", "/set_state") in session.calls
+
+
+async def test_arm_sent_on_old_status(hub: STLAlarmHub, session: FakeSession) -> None:
+    """Test arming is only dropped on status fetched around its queueing."""
+    session.bodies["/status"]["partitions"][0]["state"] = "AWAY"
+    await hub.fetch_info()
+    assert await hub.triggeralarm("full", "1234")
+    assert ("POST", "/set_state") not in session.calls
+
+    hub._status_fetched_at -= 60
+    assert await hub.triggeralarm("full", "1234")
+    assert ("POST", "/set_state") in session.calls
+
+
+async def test_restore_stored_state(session: FakeSession, account: STLAccount) -> None:
+    """Test a new hub starts from the state stored by the last one."""
+    hub = stored_hub(session, account)
+    await hub.fetch_info()
+    hub.async_shutdown()
+
+    restored = stored_hub(session, account)
+    restored._store = hub._store
+    snapshot = await restored.async_restore()
+    assert snapshot.alarm_state == STATE_ALARM_DISARMED
+    assert snapshot.zones["door"].is_open
+    assert await restored.get_panel() == f"PowerMaster{PANEL_ID}"
+    restored.async_shutdown()
+
+
+async def test_state_not_stored_without_panel(
+    session: FakeSession, account: STLAccount
+) -> None:
+    """Test nothing is stored before the panel information is fetched."""
+    session.fail.add("/panel_info")
+    hub = stored_hub(session, account)
+    with pytest.raises(UpdateFailed):
+        await hub.fetch_info()
+    assert hub._store.data is None
+    hub.async_shutdown()
+
+
+async def test_stored_state_without_panel_ignored(
+    session: FakeSession, account: STLAccount
+) -> None:
+    """Test stored state lacking the panel information is not restored."""
+    hub = stored_hub(session, account)
+    hub._store.data = {"panel": {}, "snapshot": hub._snapshot.as_dict()}
+    assert await hub.async_restore() is None
+    assert await hub.get_panel() is None
+    hub.async_shutdown()
+
+
+async def test_failed_responses_released(
+    hub: STLAlarmHub, session: FakeSession
+) -> None:
+    """Test responses retried or given up on release their connection."""
+    await hub.fetch_info()
+    session.fail.update(("/devices", "/set_state"))
+    poll_everything(hub)
+    await hub.fetch_info()
+    with pytest.raises(UpdateFailed):
+        await hub.triggeralarm("full", "1234")
+    failed = [response for response in session.responses if response.status == 500]
+    assert session.count("/devices") > 2
+    assert failed and all(response.released for response in failed)
+
+
+async def test_first_cached_fetches_spread(
+    session: FakeSession, account: STLAccount
+) -> None:
+    """Test panels of a fleet do not fetch slow moving endpoints together."""
+    fleet = STLFleetScheduler(8, 1000, 100)
+    hubs = []
+    for panel_id in ("first", "second"):
+        fleet.register(panel_id)
+        hubs.append(
+            STLAlarmHub(
+                "user@example.com",
+                "secret",
+                "app",
+                "1234",
+                panel_id,
+                session,
+                account,
+                fleet=fleet,
+            )
+        )
+    for hub in hubs:
+        await hub.fetch_info()
+        await asyncio.sleep(0)
+        hub.async_shutdown()
+    # Only the panel at phase 0 fetched them, both needed the panel information
+    assert session.count("/alarms") == session.count("/troubles") == 1
+    assert session.count("/panel_info") == 2
+
+
+async def test_partitions_parsed(hub: STLAlarmHub, session: FakeSession) -> None:
+    """Test each partition is kept, the first one being the panel state."""
+    session.bodies["/status"]["partitions"] = [
+        {"id": 1, "state": "HOME", "status": "", "ready": False},
+        {"id": 2, "state": "DISARM", "status": "", "ready": True},
+    ]
+    snapshot = await hub.fetch_info()
+    assert snapshot.alarm_state == STATE_ALARM_ARMED_HOME
+    assert not snapshot.is_ready
+    assert snapshot.partition(2) == STLPartition(2, "DISARM", "", True)
+    assert snapshot.partition(2).alarm_state == STATE_ALARM_DISARMED
+    assert snapshot.partition(-1) is None
+
+    stored = json.loads(json.dumps(snapshot.as_dict()))
+    assert STLPanelSnapshot.from_dict(stored) == snapshot
+    # Snapshots stored before partitions were kept have the panel state only
+    del stored["partitions"]
+    assert STLPanelSnapshot.from_dict(stored).partitions == (
+        STLPartition(-1, "HOME", "", False),
+    )
+
+
+async def test_command_targets_partition(
+    hub: STLAlarmHub, session: FakeSession
+) -> None:
+    """Test commands change only the partition they are sent to."""
+    session.bodies["/status"]["partitions"] = [
+        {"id": 1, "state": "DISARM", "status": "", "ready": True},
+        {"id": 2, "state": "DISARM", "status": "", "ready": True},
+    ]
+    await hub.fetch_info()
+    assert await hub.triggeralarm("full", "1234", 2)
+    assert session.posted[-1] == {"partition": 2, "state": "AWAY"}
+    assert hub.command_pending(2)
+    assert not hub.command_pending(1)
+
+    # Commands to the whole panel are pending on every partition
+    assert await hub.triggeralarm("partial", "1234")
+    assert session.posted[-1] == {"partition": -1, "state": "HOME"}
+    assert hub.command_pending(1)
@@ -0,0 +1,68 @@
+"""Tests running the STL hub against the mock Visonic API."""
+from __future__ import annotations
+
+from aiohttp import ClientSession
+from homeassistant.const import STATE_ALARM_ARMED_AWAY, STATE_ALARM_DISARMED
+import pytest
+import pytest_asyncio
+
+from benchmarks.load import MockSession
+from benchmarks.mock_server import MockConfig, MockServer
+from custom_components.stl import STLAlarmHub
+from custom_components.stl.auth import STLAccount
+
+from .conftest import PANEL_ID, FakeStore
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture(scope="module")
+def server():
+    """Run the mock API for the tests of the module."""
+    server = MockServer(
+        MockConfig(latency=0, jitter=0, zones=4, events=3, process_polls=0)
+    )
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest_asyncio.fixture
+async def mock_hub(server: MockServer):
+    """Return hub of a panel served by the mock API."""
+    async with ClientSession() as client:
+        websession = MockSession(client, server.url)
+        account = STLAccount(
+            FakeStore(), "user@example.com", "secret", "app", websession
+        )
+        hub = STLAlarmHub(
+            "user@example.com", "secret", "app", "1234", PANEL_ID, websession, account
+        )
+        yield hub
+        hub.async_shutdown()
+
+
+async def test_fetch_from_mock_server(
+    server: MockServer, mock_hub: STLAlarmHub
+) -> None:
+    """Test a snapshot of a simulated panel."""
+    server.panel(PANEL_ID).open_zones = {1}
+    snapshot = await mock_hub.fetch_info()
+    assert snapshot.alarm_state == STATE_ALARM_DISARMED
+    # Zone 3 is a motion sensor
+    assert sorted(snapshot.zones) == [f"{PANEL_ID}-{zone}" for zone in range(3)]
+    assert [zone.is_open for zone in snapshot.zones.values()] == [False, True, False]
+
+
+async def test_command_on_mock_server(
+    server: MockServer, mock_hub: STLAlarmHub
+) -> None:
+    """Test arming a simulated panel."""
+    server.panel(PANEL_ID).state = "DISARM"
+    await mock_hub.fetch_info()
+    assert await mock_hub.triggeralarm("full", "1234")
+    assert server.panel(PANEL_ID).state == "AWAY"
+
+    snapshot = await mock_hub.fetch_info()
+    assert snapshot.alarm_state == STATE_ALARM_ARMED_AWAY
+    assert not mock_hub.command_pending(-1)
@@ -0,0 +1,77 @@
+"""Tests for the streaming devices parser."""
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from custom_components.stl.models import STLZone
+from custom_components.stl.parser import STLDeviceParser
+
+DEVICES = [
+    {
+        "id": "1",
+        "zone_type": "PERIMETER",
+        "subtype": "MC303_VANISH",
+        "traits": {"location": {"name": "Dörr"}},
+        "warnings": [{"type": "OPENED"}],
+    },
+    {
+        "id": "2",
+        "zone_type": "DELAY_1",
+        "subtype": "MC303_VANISH",
+        "traits": {"location": {"name": "Back door"}},
+        "warnings": None,
+    },
+    {
+        "id": "3",
+        "zone_type": "PERIMETER",
+        "subtype": "MOTION_CAMERA",
+        "traits": {"location": {"name": "Hall"}},
+        "warnings": [{"type": "OPENED"}],
+    },
+]
+ZONES = {
+    "1": STLZone("1", "Dörr", True),
+    "2": STLZone("2", "Back door", False),
+}
+
+
+def parse(body: bytes, size: int) -> dict[str, STLZone]:
+    """Feed body to a parser in chunks of size."""
+    parser = STLDeviceParser()
+    for start in range(0, len(body), size):
+        parser.feed(body[start : start + size])
+    return parser.close()
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64, 100000])
+def test_parse_in_chunks(size: int) -> None:
+    """Test door sensors are found however the body is split.
+
+    Chunks of a single byte also split the UTF-8 encoding of a name.
+    """
+    body = json.dumps(DEVICES, ensure_ascii=False, indent=2).encode()
+    assert parse(body, size) == ZONES
+
+
+def test_parse_empty_list() -> None:
+    """Test a panel without devices."""
+    assert parse(b" [ ] \n", 1) == {}
+
+
+def test_devices_parsed_as_they_arrive() -> None:
+    """Test complete devices are parsed before the body ends."""
+    body = json.dumps(DEVICES).encode()
+    parser = STLDeviceParser()
+    parser.feed(body[: body.index(b'{"id": "2"')])
+    assert parser.zones == {"1": ZONES["1"]}
+
+
+@pytest.mark.parametrize(
+    "body", [b'{"id": "1"}', json.dumps(DEVICES).encode()[:-1], b"[] trailing"]
+)
+def test_malformed_body(body: bytes) -> None:
+    """Test bodies that are not a complete list are rejected."""
+    with pytest.raises(ValueError):
+        parse(body, 16)
@@ -0,0 +1,114 @@
+"""Tests for the retry policy and circuit breaker."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from unittest.mock import patch
+
+from homeassistant.helpers.update_coordinator import UpdateFailed
+import pytest
+
+from custom_components.stl.const import BACKOFF_MAX
+from custom_components.stl.retry import (
+    STLCircuitBreaker,
+    backoff_delay,
+    parse_retry_after,
+)
+
+
+class Clock:
+    """Monotonic clock moved by hand."""
+
+    def __init__(self) -> None:
+        """Initialize clock."""
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        """Return current time."""
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """Patch the clock of the circuit breaker."""
+    clock = Clock()
+    with patch("custom_components.stl.retry.monotonic", clock):
+        yield clock
+
+
+def test_backoff_delay_grows_up_to_max() -> None:
+    """Test jittered backoff is bounded by the attempt and the maximum."""
+    with patch("custom_components.stl.retry.random.uniform", lambda a, b: b):
+        assert backoff_delay(0) == 1
+        assert backoff_delay(3) == 8
+        assert backoff_delay(10) == BACKOFF_MAX
+
+
+def test_backoff_delay_follows_retry_after() -> None:
+    """Test Retry-After replaces the backoff, within the maximum."""
+    assert backoff_delay(0, "7") == 7
+    assert backoff_delay(0, "3600") == BACKOFF_MAX
+
+
+def test_parse_retry_after() -> None:
+    """Test Retry-After in seconds, as a date and malformed."""
+    assert parse_retry_after("12") == 12
+    assert parse_retry_after("-5") == 0
+    when = datetime.now(timezone.utc) + timedelta(seconds=20)
+    assert 18 < parse_retry_after(format_datetime(when, usegmt=True)) <= 20
+    assert parse_retry_after("soon") is None
+
+
+def test_breaker_opens_after_threshold(clock: Clock) -> None:
+    """Test requests are stopped after consecutive failures only."""
+    breaker = STLCircuitBreaker(failure_threshold=3, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.before_request()
+    assert not breaker.is_open
+
+    breaker.record_failure()
+    assert breaker.is_open
+    with pytest.raises(UpdateFailed):
+        breaker.before_request()
+
+
+def test_breaker_lets_one_probe_through(clock: Clock) -> None:
+    """Test a single probe is sent after the reset timeout."""
+    breaker = STLCircuitBreaker(failure_threshold=1, reset_timeout=60, probe_timeout=30)
+    breaker.record_failure()
+    clock.now += 59
+    with pytest.raises(UpdateFailed):
+        breaker.before_request()
+
+    clock.now += 1
+    breaker.before_request()
+    with pytest.raises(UpdateFailed):
+        breaker.before_request()
+
+    # A probe never reporting back does not keep the circuit stuck
+    clock.now += 30
+    breaker.before_request()
+
+
+def test_breaker_probe_outcome(clock: Clock) -> None:
+    """Test a failed probe reopens the circuit and a successful one closes it."""
+    breaker = STLCircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    clock.now += 60
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.is_open
+    clock.now += 59
+    with pytest.raises(UpdateFailed):
+        breaker.before_request()
+
+    clock.now += 1
+    breaker.before_request()
+    breaker.record_success()
+    assert not breaker.is_open
+    breaker.before_request()
+    breaker.before_request()